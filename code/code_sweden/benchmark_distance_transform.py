@@ -0,0 +1,67 @@
+#---------------------------------------
+# Title: Benchmark of the distance transform engine against r.grow.distance
+#   for the distance layers of the Mala and Tassasen study areas
+# Author: Bernardo Niebuhr
+#---------------------------------------
+
+python
+
+# import modules
+import os
+import grass.script as grass
+from grass.pygrass.modules.shortcuts import general as g
+
+#---------------------------------------
+# Setup
+
+# code folder
+code_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\00_grassdb\code"
+os.chdir(code_dir)
+
+# import functions
+from distance_transform import benchmark_distance
+
+# map to align
+map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
+
+# distance layers used in the study areas
+distance_layers = {"wind_turbines_operation_2020_rast@p_sam_industry": "wind_dist",
+    "power_lines_lm_2020_rast@p_sam_industry": "pl_dist",
+    "buildings_lm_2020_rast@p_sam_transport_urban": "building_dist",
+    "houses_lm_2020_rast@p_sam_transport_urban": "house_dist",
+    "private_roads_lm_2020_rast@p_sam_transport_urban": "priv_road_dist",
+    "public_roads_lm_2020_rast@p_sam_transport_urban": "public_road_dist",
+    "railways_lm_2020_rast@p_sam_transport_urban": "railway_dist",
+    "urban_lm_2020_rast@p_sam_transport_urban": "urban_dist",
+    "trails_lm_2020_rast@p_sam_tourism": "trail_dist"}
+
+# study areas
+areas = {"availability_mala": "availability_mala_autumn@sam_reindeer_ancillary",
+    "availability_tassasen": "availability_general_Tassasen@sam_reindeer_ancillary"}
+
+#---------------------------------------
+# Benchmark
+
+# cut_maps uses r.grow.distance by default; the EDT engine is only used for the study
+# areas with distance_engine = "edt", which should be set if it is faster here
+
+g.mapset(mapset = "benchmark_distance", flags = "c")
+g.mapsets(mapset = ["p_sam_industry", "p_sam_transport_urban", "p_sam_tourism"], operation = "add")
+
+times = {}
+for area, vector in areas.items():
+
+    print(area)
+    g.region(vector = vector, align = map_to_align, flags = "ap")
+    times[area] = benchmark_distance(distance_layers, nthreads = 8)
+
+    # differences between the two methods
+    for i in distance_layers.values():
+        grass.mapcalc("diff = abs("+i+" - "+i+"_grow)", overwrite = True, quiet = True)
+        print(i + ": max difference " + str(grass.raster_info("diff")["max"]))
+
+print(times)
+
+# remove maps
+g.remove(type = "raster", pattern = "*_dist*", flags = "f")
+g.remove(type = "raster", name = "diff", flags = "f")
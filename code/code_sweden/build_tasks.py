@@ -0,0 +1,231 @@
+import os
+import json
+import hashlib
+import grass.script as grass
+from grass.pygrass.modules.shortcuts import general as g
+
+from parallel_grass import run_parallel
+
+# function to compute the content hash of a file
+def file_hash(path = "", chunk_size = 2**20):
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+# function to get the modification time of a GRASS raster or vector map
+# returns None if the map does not exist
+def map_timestamp(name = ""):
+
+    # raster: the header is always there, the data files depend on the map type
+    found = grass.find_file(name, element = "cellhd")
+    if found["file"]:
+        mapset_dir = os.path.dirname(os.path.dirname(found["file"]))
+        files = [os.path.join(mapset_dir, i, found["name"]) for i in ("cellhd", "cell", "fcell")]
+        return "raster:" + str(max(os.path.getmtime(i) for i in files if os.path.exists(i)))
+
+    # vector: the map is a folder with geometry, topology and attribute link files
+    found = grass.find_file(name, element = "vector")
+    if found["file"]:
+        files = [os.path.join(found["file"], i) for i in os.listdir(found["file"])]
+        return "vector:" + str(max(os.path.getmtime(i) for i in files))
+
+    return None
+
+# function to get the signature of a task input: the content hash for files
+# and the modification time for GRASS maps
+def input_signature(name = ""):
+
+    if os.path.isfile(name):
+        return "file:" + file_hash(name)
+
+    return map_timestamp(name)
+
+# function to get the hash of the definition of a task: the steps and parameters of its
+# job, its params and the code (and default arguments) of its action, so that editing a
+# task runs it again
+def task_definition(task):
+
+    action = None
+    if task["action"] is not None:
+        code = task["action"].__code__
+        # nested functions are compared by their code, not by their address
+        action = {"code": code.co_code.hex(), "defaults": repr(task["action"].__defaults__),
+            "consts": [i.co_code.hex() if hasattr(i, "co_code") else repr(i) for i in code.co_consts]}
+    job = None
+    if task["job"] is not None:
+        # times are added to the job when it is run
+        job = {k: v for k, v in task["job"].items() if k not in ("time", "merge_time")}
+    definition = {"job": job, "params": task["params"], "action": action}
+    return hashlib.sha256(json.dumps(definition, sort_keys = True, default = str).encode()).hexdigest()
+
+# function to add a task to a task graph
+# outputs are the names of the maps created by the task (a name or a list of names),
+# inputs are the maps or files it depends on, and action is a function
+# (with no arguments) that creates the outputs
+# alternatively, job is a job for parallel_grass.run_parallel; the jobs of the same mapset
+# that have to be run are run concurrently
+# params are the parameters used by the action that are not in its code (e.g. where
+# clauses in a global dictionary); the task is run again if they change
+def add_task(tasks, outputs = [], inputs = [], action = None, mapset = None, job = None,
+    params = None):
+
+    if isinstance(outputs, str):
+        outputs = [outputs]
+
+    task = {"outputs": list(outputs), "inputs": list(inputs), "action": action, "mapset": mapset,
+        "job": job, "params": params}
+    for i in outputs:
+        if i in tasks:
+            raise ValueError("Task for output <" + i + "> is already defined.")
+        tasks[i] = task
+    return tasks
+
+# function to get the tasks a task depends on, by their first output
+def task_dependencies(tasks, task):
+
+    deps = []
+    for i in task["inputs"]:
+        # inputs may be given with @mapset
+        dep = i.split("@")[0]
+        if dep in tasks and dep not in task["outputs"]:
+            deps.append(tasks[dep]["outputs"][0])
+    return deps
+
+# function to sort tasks so that every task comes after the tasks producing its inputs
+# tasks are identified by their first output
+def sort_tasks(tasks, targets = None):
+
+    # tasks required for the targets (all tasks by default)
+    if targets is None:
+        targets = list(tasks)
+
+    order = []
+    state = {}
+
+    def visit(name, path):
+        task = tasks[name]
+        key = task["outputs"][0]
+        if state.get(key) == "done":
+            return
+        if state.get(key) == "visiting":
+            raise ValueError("Cyclic dependency: " + " -> ".join(path + [name]))
+        state[key] = "visiting"
+        for dep in task_dependencies(tasks, task):
+            visit(dep, path + [name])
+        state[key] = "done"
+        order.append(key)
+
+    for name in targets:
+        visit(name, [])
+
+    return order
+
+# function to group sorted tasks in waves: each task is in the wave after the last
+# of the tasks it depends on, so the tasks of a wave are independent of each other
+def task_waves(tasks, order):
+
+    level = {}
+    waves = []
+    for name in order:
+        level[name] = 1 + max([level[i] for i in task_dependencies(tasks, tasks[name])], default = -1)
+        if level[name] == len(waves):
+            waves.append([])
+        waves[level[name]].append(name)
+    return waves
+
+# function to run only the tasks whose output does not exist or whose inputs or definition
+# changed since the last run. The signatures of the inputs and the hash of the definition of
+# each task are recorded in state_file.
+# tasks are run by waves: the actions one by one, and then the jobs of each mapset
+# concurrently, by nprocs processes
+# tasks with inputs not found are skipped, as well as the tasks depending on them, and the
+# other tasks are run; the skipped tasks are reported at the end
+def run_tasks(tasks, state_file = "", targets = None, force = False, nprocs = 4):
+
+    # signatures from previous runs
+    state = {}
+    if os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            state = json.load(f)
+
+    current_mapset = grass.gisenv()["MAPSET"]
+    built = []
+    skipped = {}
+
+    # save after each task so that an interrupted run can be resumed
+    def done(name, mapset, signature):
+        state[name + "@" + mapset] = signature
+        with open(state_file, "w") as f:
+            json.dump(state, f, indent = 2)
+        built.extend(tasks[name]["outputs"])
+
+    for wave in task_waves(tasks, sort_tasks(tasks, targets = targets)):
+
+        # tasks to be run
+        # inputs are checked after upstream tasks were run, so that rebuilt
+        # upstream maps also trigger the downstream tasks
+        stale = []
+        for name in wave:
+            task = tasks[name]
+            mapset = task["mapset"] or current_mapset
+
+            upstream = [i for i in task_dependencies(tasks, task) if i in skipped]
+            if upstream:
+                skipped[name] = "depends on skipped tasks: " + ", ".join(upstream)
+                print("skipped: " + ", ".join(task["outputs"]) + " (" + skipped[name] + ")")
+                continue
+            inputs = {i: input_signature(i) for i in task["inputs"]}
+            missing = [i for i in inputs if inputs[i] is None]
+            if missing:
+                skipped[name] = "inputs not found: " + ", ".join(missing)
+                print("skipped: " + ", ".join(task["outputs"]) + " (" + skipped[name] + ")")
+                continue
+
+            signature = {"inputs": inputs, "definition": task_definition(task)}
+            exists = all(map_timestamp(i + "@" + mapset) is not None for i in task["outputs"])
+            if not force and exists and state.get(name + "@" + mapset) == signature:
+                print("up to date: " + ", ".join(task["outputs"]))
+                continue
+            print("building: " + ", ".join(task["outputs"]))
+            stale.append((name, mapset, signature))
+
+        # actions
+        for name, mapset, signature in stale:
+            if tasks[name]["job"] is not None:
+                continue
+            if mapset != grass.gisenv()["MAPSET"]:
+                g.mapset(mapset = mapset)
+            tasks[name]["action"]()
+            done(name, mapset, signature)
+
+        # jobs, merged into their mapset
+        jobs = {}
+        for name, mapset, signature in stale:
+            if tasks[name]["job"] is not None:
+                jobs.setdefault(mapset, []).append((name, signature))
+        for mapset in jobs:
+            if mapset != grass.gisenv()["MAPSET"]:
+                g.mapset(mapset = mapset)
+            names = {id(tasks[name]["job"]): (name, signature) for name, signature in jobs[mapset]}
+            run_parallel([tasks[name]["job"] for name, signature in jobs[mapset]], nprocs = nprocs,
+                on_merged = lambda job: done(names[id(job)][0], mapset, names[id(job)][1]))
+
+    if skipped:
+        print(str(len(skipped)) + " tasks skipped:")
+        for name in skipped:
+            print("  " + ", ".join(tasks[name]["outputs"]) + ": " + skipped[name])
+
+    # go back to the initial mapset
+    if grass.gisenv()["MAPSET"] != current_mapset:
+        g.mapset(mapset = current_mapset)
+
+    return built
+
+# function to get the default file where the build state is stored, in the location folder
+def default_state_file(name = "build_state.json"):
+
+    env = grass.gisenv()
+    return os.path.join(env["GISDBASE"], env["LOCATION_NAME"], name)
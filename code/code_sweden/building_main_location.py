@@ -41,60 +41,61 @@ os.chdir(code_dir)
 
 # import functions
 from calculate_tpi import calculate_tpi
+from build_tasks import add_task, run_tasks, default_state_file
+from bulk_import import source, bulk_import
+from rasterize_groups import rasterize_groups
+from import_xyz import import_xyz_dir
 
 # root folder
 root_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\03_raster"
 os.chdir(root_dir)
 
+# raster files are imported in parallel, directly in their mapset; the content
+# of each imported file is recorded in import_state.json, so that files that did not
+# change since the last run are skipped
+nprocs_import = 8
+import_state_file = default_state_file("import_state.json")
+
 #---------------------------------------
 # Load data - landscape data
 
-# mapset
-g.mapset(mapset = "p_sam_landscape")
-
 # folder
 landscape_dir = r"p_sam_landscape/"
 
-# load vegetation data - NMD - OK
-r.in_gdal(input = landscape_dir+"landcover_nmd_ungeneralized/nmd2018bas_ogeneraliserad_v1_0.tif", 
-    output = "landcover_ungeneralized_nmd1_10m_2018")
-
-# load auxiliary vegetation data - SMD - OK
-r.in_gdal(input = landscape_dir+"landcover_smd_generalized/mosaic/smdb99.tif", 
-    output = "landcover_smd_25m_2004")
-
-# load elevation data 50m - OK
-# r.in_gdal(input = landscape_dir+"dem_50m/dem50m.tif", output = "dem_lm_50m_2013")
+landscape = [
+    # load vegetation data - NMD - OK
+    # linked, not copied, through a tiled copy of the file (cloud optimized GeoTIFF)
+    source(landscape_dir+"landcover_nmd_ungeneralized/nmd2018bas_ogeneraliserad_v1_0.tif", 
+        "landcover_ungeneralized_nmd1_10m_2018", "p_sam_landscape", "r.in.gdal", 
+        external = True, tiled = "cog"),
+    # load auxiliary vegetation data - SMD - OK
+    source(landscape_dir+"landcover_smd_generalized/mosaic/smdb99.tif", 
+        "landcover_smd_25m_2004", "p_sam_landscape", "r.in.gdal"),
+    # load elevation data 50m - OK
+    # source(landscape_dir+"dem_50m/dem50m.tif", "dem_lm_50m_2013", "p_sam_landscape", "r.in.gdal"),
+    # load general lichen map for Sweden
+    source(landscape_dir+"lichen_sven/lav_model_south_no_roads_masked.tif", 
+        "lichen_model_Sweden", "p_sam_landscape", "r.in.gdal"),
+    # load lichen map callibrted for Tassasen
+    source(landscape_dir+"lichen_sven/lichen_model_sven_tassasen_callibrated_mask_roads.tif", 
+        "lichen_model_tassasen", "p_sam_landscape", "r.in.gdal"),
+    # load lichen map callibrated for Mittadalen
+    source(landscape_dir+"lichen_sven/lichen_model_sven_mittadalen_mask_roads.tif",
+        "lichen_model_mittadalen", "p_sam_landscape", "r.in.gdal")]
 
 # load elevation related data 10m, resampled from 2m - OK
 dem_maps = os.listdir(landscape_dir+"dem_10m/")
 
 for i in dem_maps:
     if "compressed" not in i and i[-4:] == ".tif":
-        print(i)
         name = i.replace(".tif", "_2018")
-        r.in_gdal(input = landscape_dir+"dem_10m/"+i, output = name)
-
-# load general lichen map for Sweden
-r.in_gdal(input = landscape_dir+"lichen_sven/lav_model_south_no_roads_masked.tif", 
-    output = "lichen_model_Sweden", overwrite = True)
-
-# load lichen map callibrted for Tassasen
-r.in_gdal(input = landscape_dir+"lichen_sven/lichen_model_sven_tassasen_callibrated_mask_roads.tif", 
-    output = "lichen_model_tassasen", overwrite = True)
-
-# load lichen map callibrated for Mittadalen
-r.in_gdal(input = landscape_dir+"lichen_sven/lichen_model_sven_mittadalen_mask_roads.tif",
-    output = "lichen_model_mittadalen")
+        landscape.append(source(landscape_dir+"dem_10m/"+i, name, "p_sam_landscape", "r.in.gdal"))
     
 # clec
 
 #---------------------------------------
 # Load data - species data
 
-# mapset
-g.mapset(mapset = "p_sam_species")
-
 # folder
 species_dir = r"raster/p_sam_species/"
 
@@ -102,29 +103,25 @@ species_dir = r"raster/p_sam_species/"
 files = [str(path) for path in Path(species_dir).rglob('*.tif')]
 
 # load predators data - OK
-for i in files:
-    name = i.split("\\")[-1].replace(".tif", "")
-    r.in_gdal(input = i, output = name, overwrite = True)
-    grass.run_command("r.import", input = i, output = name, overwrite = True)
+# each file is imported only once (it was imported with r.in_gdal and again with r.import)
+species = [source(i, Path(i).stem, "p_sam_species", "r.in.gdal") for i in files]
 
 #---------------------------------------
 # Load data - climatic data
 
-# mapset
-g.mapset(mapset = "p_sam_climate_phenology")
-
 # folder
-species_dir = r"raster/p_sam_climate_phenology/"
+climate_dir = r"raster/p_sam_climate_phenology/"
 
 # list maps
-files = [str(path) for path in Path(species_dir).rglob('*.nc')]
+files = [str(path) for path in Path(climate_dir).rglob('*.nc')]
 
-# load predators data - OK
-for i in [files[0]]:
-    name = i.split("\\")[-1].replace(".tif", "")
-    r.in_gdal(input = i, output = name, flags = "o", overwrite = True)
-    #grass.run_command("r.import", input = i, output = name, overwrite = True)
+# load climate data - only the first file for now
+climate = [source(i, Path(i).stem, "p_sam_climate_phenology", "r.in.gdal", flags = "o") 
+    for i in files[:1]]
 
+# import
+bulk_import(landscape + species + climate, nprocs = nprocs_import, state_file = import_state_file,
+    stats_file = "import_stats_rasters.csv")
 
 #---------------------------------------
 # Load data - industry data
@@ -136,55 +133,23 @@ g.mapset(mapset = "p_sam_industry")
 industry_dir = r"p_sam_industry/"
 
 #----------------
-# Sound models - Tassasen
+# Sound models
 
-# folder
-sound_tass_dir = industry_dir + r"sound_models/Tassasen/Export_C_Mullberg/"
-
-# list maps
-files = [str(path) for path in Path(sound_tass_dir).rglob('*.TXT')]
-
-# The original files have comma as a separator for decimals
-# First we replace that with dots. This must be done only once.
-
-# for each file
-for i in files:
-    # open
-    with open(i, 'r+') as f:
-        # read the text
-        text = f.read()
-        # clear the file
-        f.seek(0)
-        f.truncate()
-        # write the text, replacing comma by dot
-        f.write(text.replace(',', '.'))
-
-# load
+# The original files have comma as a separator for decimals.
+# They are first copied with dots as decimal separator (.xyz, only once per file), 
+# and then each file is read once to define the region and import the map.
 
 # resolution 50m
 res = 50.0
 
-for i in files:
-    # name
-    name = i.split("\\")[-1].replace(".TXT", "").replace("RRLK00", "sound_model_tassasen_")
-    # print
-    print(name)
-    # region info for the xyz text file
-    region = grass.read_command("r.in.xyz", input = i, flags = "sg", separator = ";", 
-        skip = 1).replace("\r\n", "").split(" ")
-    # remove "n=", "s=", etc
-    region = [float(i[2:]) for i in region]
-    # the output is in the order n, s, e, w, b, t
-    # define region
-    n = region[0] + res/2
-    s = region[1] - res/2
-    e = region[2] + res/2
-    w = region[3] - res/2
-    # define region
-    g.region(n = n, s = s, w = w, e = e, res = res, flags = "p")
-    # read data
-    r.in_xyz(input = i, output = name, separator = ";", skip = 1, overwrite = True)
+#----------------
+# Sound models - Tassasen
+
+# folder
+sound_tass_dir = industry_dir + r"sound_models/Tassasen/Export_C_Mullberg/"
 
+# load
+import_xyz_dir(sound_tass_dir, prefix = "sound_model_tassasen_", res = res, separator = ";", skip = 1)
 
 #----------------
 # Sound models - Mittadalen
@@ -192,50 +157,8 @@ for i in files:
 # folder
 sound_mitt_dir = industry_dir + r"sound_models/Mittadalen/sound_modelling_Glotesvalen/"
 
-# list maps
-files = [str(path) for path in Path(sound_mitt_dir).rglob('*.TXT')]
-
-# The original files have comma as a separator for decimals
-# First we replace that with dots. This must be done only once.
-
-# for each file
-for i in files:
-    # open
-    with open(i, 'r+') as f:
-        # read the text
-        text = f.read()
-        # clear the file
-        f.seek(0)
-        f.truncate()
-        # write the text, replacing comma by dot
-        f.write(text.replace(',', '.'))
-
 # load
-
-# resolution 50m
-res = 50.0
-
-for i in files:
-    # name
-    name = i.split("\\")[-1].replace(".TXT", "").replace("RRLK00", "sound_model_mittadalen_")
-    # print
-    print(name)
-    # region info for the xyz text file
-    region = grass.read_command("r.in.xyz", input = i, flags = "sg", separator = ";", 
-        skip = 1).replace("\r\n", "").split(" ")
-    # remove "n=", "s=", etc
-    region = [float(i[2:]) for i in region]
-    # the output is in the order n, s, e, w, b, t
-    # define region
-    n = region[0] + res/2
-    s = region[1] - res/2
-    e = region[2] + res/2
-    w = region[3] - res/2
-    # define region
-    g.region(n = n, s = s, w = w, e = e, res = res, flags = "p")
-    # read data
-    r.in_xyz(input = i, output = name, separator = ";", skip = 1, overwrite = True)
-
+import_xyz_dir(sound_mitt_dir, prefix = "sound_model_mittadalen_", res = res, separator = ";", skip = 1)
 
 #----------------
 # Sound models - Mala
@@ -243,49 +166,8 @@ for i in files:
 # folder
 sound_mala_dir = industry_dir + r"sound_models/Mala/Export_B_Mala_201012/"
 
-# list maps
-files = [str(path) for path in Path(sound_mala_dir).rglob('*.TXT')]
-
-# The original files have comma as a separator for decimals
-# First we replace that with dots. This must be done only once.
-
-# for each file
-for i in files:
-    # open
-    with open(i, 'r+') as f:
-        # read the text
-        text = f.read()
-        # clear the file
-        f.seek(0)
-        f.truncate()
-        # write the text, replacing comma by dot
-        f.write(text.replace(',', '.'))
-
 # load
-
-# resolution 50m
-res = 50.0
-
-for i in files:
-    # name
-    name = i.split("\\")[-1].replace(".TXT", "").replace("RRLK00", "sound_model_mala_")
-    # print
-    print(name)
-    # region info for the xyz text file
-    region = grass.read_command("r.in.xyz", input = i, flags = "sg", separator = ";", 
-        skip = 1).replace("\r\n", "").split(" ")
-    # remove "n=", "s=", etc
-    region = [float(i[2:]) for i in region]
-    # the output is in the order n, s, e, w, b, t
-    # define region
-    n = region[0] + res/2
-    s = region[1] - res/2
-    e = region[2] + res/2
-    w = region[3] - res/2
-    # define region
-    g.region(n = n, s = s, w = w, e = e, res = res, flags = "p")
-    # read data
-    r.in_xyz(input = i, output = name, separator = ";", skip = 1, overwrite = True)
+import_xyz_dir(sound_mala_dir, prefix = "sound_model_mala_", res = res, separator = ";", skip = 1)
 
 
 #---------------------------------------
@@ -297,6 +179,10 @@ g.mapset(mapset = "p_sam_landscape")
 # map to align
 map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
 
+# each processed map is a task that declares the maps it is derived from,
+# so that only maps whose inputs changed since the last run are recomputed
+tasks = {}
+
 #--------------
 # reclassify land use maps
 
@@ -307,23 +193,22 @@ map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
 #--------------
 # rasterize clear cuts
 
-# map to align
-map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
-
 # mapset with vectors
 mapset_vector = "sam_env"
 
 # input map
 input_map = "clear_cuts_SKS_2020"
 
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "attr", 
-    attribute_column = "year", overwrite = True) # ideally we could have the year of operation here
+def rasterize_clear_cuts(input_map = input_map):
+    # region
+    g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
+    # rasterize
+    v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "attr", 
+        attribute_column = "year", overwrite = True) # ideally we could have the year of operation here
+    r.null(map = input_map+"_rast", null = 0)
 
-r.null(map = input_map+"_rast", null = 0)
+add_task(tasks, outputs = input_map+"_rast", inputs = [input_map+"@"+mapset_vector], 
+    action = rasterize_clear_cuts)
 
 #--------------
 # update SMD 2000 with clear cuts on 2007, when the GPS started to be collected
@@ -332,45 +217,61 @@ land_cover_input = "landcover_smd_25m_2004"
 clear_cuts = "clear_cuts_SKS_2020_rast"
 output_smd_cc = "landcover_smd_25m_clearcuts_2007"
 
-expr = output_smd_cc+" = if(("+clear_cuts+" < 2008 && "+clear_cuts+" > 2000), 54, "+land_cover_input+")"
-
-# region
-g.region(raster = land_cover_input, align = map_to_align, flags = "ap")
-
-# consider clear cuts as clear cuts
-r.mapcalc(expr, overwrite = True)
+def update_smd_clear_cuts():
+    expr = output_smd_cc+" = if(("+clear_cuts+" < 2008 && "+clear_cuts+" > 2000), 54, "+land_cover_input+")"
+    # region
+    g.region(raster = land_cover_input, align = map_to_align, flags = "ap")
+    # consider clear cuts as clear cuts
+    r.mapcalc(expr, overwrite = True)
+    # redefine colors
+    r.colors(map = output_smd_cc, raster = land_cover_input)
 
-# redefine colors
-r.colors(map = output_smd_cc, raster = land_cover_input)
+add_task(tasks, outputs = output_smd_cc, inputs = [land_cover_input, clear_cuts], 
+    action = update_smd_clear_cuts)
 
 #--------------
 # calculate aspect, slope and VRM based on DEM 50m
 dem_map = "dem_lm_50m_2013"
 
-# region
-g.region(raster = map_to_align, res = 50, flags = "ap")
-# slope and aspect
 slope_map = dem_map.replace("dem", "dem_slope")
 aspect_map = dem_map.replace("dem", "dem_aspect")
-r.slope_aspect(elevation = dem_map, slope = slope_map, 
-    aspect = aspect_map, flags = "e", overwrite = True)
+
+def slope_aspect():
+    # region
+    g.region(raster = map_to_align, res = 50, flags = "ap")
+    # slope and aspect
+    r.slope_aspect(elevation = dem_map, slope = slope_map, 
+        aspect = aspect_map, flags = "e", overwrite = True)
+
+add_task(tasks, outputs = [slope_map, aspect_map], inputs = [dem_map], action = slope_aspect)
+
 # TPI
 radius_m = 510
 pixel_size = 10
 size = int(2*radius_m/10 + 1)
 tpi_map = dem_map.replace("dem", "dem_tpi_s"+str(radius_m)+"m")
-calculate_tpi(input = dem_map, output = tpi_map, size = size, flags = "c")
+
+def tpi():
+    g.region(raster = map_to_align, res = 50, flags = "ap")
+    calculate_tpi(input = dem_map, output = tpi_map, size = size, flags = "c")
+
+add_task(tasks, outputs = tpi_map, inputs = [dem_map], action = tpi)
 
 # aspect in 4 direction - NESW
 aspect_4_directionsNESW = aspect_map.replace("aspect", "aspect_4_directionsNESW")
-expression = aspect_4_directionsNESW+" = eval( \
-   compass=(450 - "+aspect_map+" ) % 360, \
-     if(compass >=0. && compass < 45., 1) \
-   + if(compass >=45. && compass < 135., 2) \
-   + if(compass >=135. && compass < 225., 3) \
-   + if(compass >=225. && compass < 315., 4) \
-   + if(compass >=315., 1))"
-r.mapcalc(expression)
+
+def aspect_nesw():
+    expression = aspect_4_directionsNESW+" = eval( \
+       compass=(450 - "+aspect_map+" ) % 360, \
+         if(compass >=0. && compass < 45., 1) \
+       + if(compass >=45. && compass < 135., 2) \
+       + if(compass >=135. && compass < 225., 3) \
+       + if(compass >=225. && compass < 315., 4) \
+       + if(compass >=315., 1))"
+    g.region(raster = map_to_align, res = 50, flags = "ap")
+    r.mapcalc(expression, overwrite = True)
+
+add_task(tasks, outputs = aspect_4_directionsNESW, inputs = [aspect_map], action = aspect_nesw)
 
 # check if worked, and then calculate NE, SE, SW, NW
 
@@ -387,289 +288,157 @@ road_map1 = "public_roads_lm_2019_rast@p_sam_transport_urban"
 road_map2 = "private_roads_lm_2019_rast@p_sam_transport_urban"
 
 # map to align
-map_to_align = "landcover_generalized_nmd1_10m_2018@p_sam_landscape"
-
-# region
-g.region(raster = "lichen_model_south_no_roads_masked", align = map_to_align, flags = "ap")
+map_to_align_lichen = "landcover_generalized_nmd1_10m_2018@p_sam_landscape"
 
 # mapcalc
 input_lichen_map = "lichen_model_south_no_roads_masked"
 lichen_map_name = "lichen_model_Sweden"
-expression = lichen_map_name+" = if(isnull("+road_map1+") && isnull("+road_map2+"), "+input_lichen_map+", null())"
-r.mapcalc(expression, overwrite = True)
+
+def remove_roads_lichen():
+    # region
+    g.region(raster = input_lichen_map, align = map_to_align_lichen, flags = "ap")
+    expression = lichen_map_name+" = if(isnull("+road_map1+") && isnull("+road_map2+"), "+input_lichen_map+", null())"
+    r.mapcalc(expression, overwrite = True)
+
+add_task(tasks, outputs = lichen_map_name, inputs = [input_lichen_map, road_map1, road_map2], 
+    action = remove_roads_lichen)
 
 #---------------------------------------
 # Process industry data
 
-# mapset
-g.mapset(mapset = "p_sam_industry")
-
 # map to align
 map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
 
 # mapset with vectors
 mapset_vector = "sam_env"
 
-#--------------
-# wind turbines - OK
-
-input_map = "wind_turbines_operation_2020"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-# distance - does it make sense to do it for the whole country?
-
-#--------------
-# wind turbines - Mullberg - Tassasen - OK
+# number of parallel jobs
+nprocs = 16
 
-input_map = "wind_turbines_operation_2020"
-wf_code = "2326-V-015"
-output_map = "wind_turbines_Mullberg"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
+# each rasterization is an independent job, run in parallel in its own temporary
+# mapset and region, and copied to the mapset of the task when finished
+def rasterize_job(input_map, output_map, **kwargs):
+    
+    # by default, rasterize with value 1
+    if "use" not in kwargs:
+        kwargs.update(use = "val", value = 1)
+    
+    return {"region": {"vector": input_map+"@"+mapset_vector, "align": map_to_align, "flags": "a"},
+        "steps": [("v.to_rast", dict(input = input_map+"@"+mapset_vector, output = output_map, 
+            overwrite = True, **kwargs))], # ideally we could have the year of operation here
+        "outputs": [output_map]}
 
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = output_map, 
-    where = "Omrades_ID = '"+wf_code+"'", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
+# function to add the task rasterizing a vector map, run only if the vector changed
+def add_rasterize_task(input_map, mapset, **kwargs):
+    
+    add_task(tasks, outputs = input_map+"_rast", inputs = [input_map+"@"+mapset_vector], 
+        job = rasterize_job(input_map, input_map+"_rast", **kwargs), mapset = mapset)
+
+# distances to the features of a rasterized map, computed once for the whole country
+# (region of map_to_align), so that the study areas only cut them; computing the
+# distances within each study area ignores the features just outside its limits
+# r.grow.distance runs directly in the mapset of the task, with the national region
+# given to the module, so each distance map is written only once
+def distance_job(input_map, output_map):
+    
+    return {"region": {"raster": map_to_align}, "in_place": True,
+        "steps": [("r.grow.distance", dict(input = input_map, distance = output_map, 
+            overwrite = True))],
+        "outputs": [output_map]}
+
+# function to add the task computing the distances to a rasterized map, run only if
+# the rasterized map changed
+def add_distance_task(input_map, mapset):
+    
+    add_task(tasks, outputs = input_map+"_dist", inputs = [input_map+"_rast@"+mapset], 
+        job = distance_job(input_map+"_rast@"+mapset, input_map+"_dist"), mapset = mapset)
 
 #--------------
-# wind turbines - Mala - OK
-
-# Jokkmokksliden, Storliden, Ytteberget
-input_map = "wind_turbines_operation_2020"
-wf_code = "('2418-V-007', '2418-V-008', '2418-V-004')"
-output_map = "wind_turbines_Mala_jokk_stor_ytte"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = output_map, 
-    where = "Omrades_ID in "+wf_code, use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-# Jokkmokksliden
-input_map = "wind_turbines_operation_2020"
-wf_code = "('2418-V-007')"
-output_map = "wind_turbines_Mala_jokk"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = output_map, 
-    where = "Omrades_ID in "+wf_code, use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-# Storliden
-input_map = "wind_turbines_operation_2020"
-wf_code = "('2418-V-008')"
-output_map = "wind_turbines_Mala_stor"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = output_map, 
-    where = "Omrades_ID in "+wf_code, use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-# Ytteberget
-input_map = "wind_turbines_operation_2020"
-wf_code = "('2418-V-004')"
-output_map = "wind_turbines_Mala_ytte"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = output_map, 
-    where = "Omrades_ID in "+wf_code, use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
+# wind turbines - OK
 
-# Amliden
+# all outputs from the wind turbines are rasterized from a single read of the vector:
+# it is rasterized once with the turbine categories, and each output selects the
+# turbines of the wind farms (Omrades_ID) it contains
 input_map = "wind_turbines_operation_2020"
-wf_code = "2418-V-005"
-output_map = "wind_turbines_Mala_amliden"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
 
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = output_map, 
-    where = "Omrades_ID = '"+wf_code+"'", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
+wind_farms = {
+    # all turbines
+    input_map+"_rast": None, # ideally we could have the year of operation here
+    # Mullberg - Tassasen
+    "wind_turbines_Mullberg": "Omrades_ID = '2326-V-015'",
+    # Mala - Jokkmokksliden, Storliden, Ytteberget
+    "wind_turbines_Mala_jokk_stor_ytte": "Omrades_ID in ('2418-V-007', '2418-V-008', '2418-V-004')",
+    # Jokkmokksliden
+    "wind_turbines_Mala_jokk": "Omrades_ID in ('2418-V-007')",
+    # Storliden
+    "wind_turbines_Mala_stor": "Omrades_ID in ('2418-V-008')",
+    # Ytteberget
+    "wind_turbines_Mala_ytte": "Omrades_ID in ('2418-V-004')",
+    # Amliden
+    "wind_turbines_Mala_amliden": "Omrades_ID = '2418-V-005'"}
+
+def rasterize_wind_turbines(input_map = input_map):
+    rasterize_groups(input = input_map+"@"+mapset_vector, groups = wind_farms, map_to_align = map_to_align)
+
+add_task(tasks, outputs = [input_map+"_cat"] + list(wind_farms), inputs = [input_map+"@"+mapset_vector], 
+    action = rasterize_wind_turbines, mapset = "p_sam_industry", params = wind_farms)
+
+# distance
+add_distance_task(input_map, "p_sam_industry")
 
 #--------------
 # power lines - OK
 
-input_map = "power_lines_lm_2020"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
+add_rasterize_task("power_lines_lm_2020", "p_sam_industry")
+add_distance_task("power_lines_lm_2020", "p_sam_industry")
 
 #--------------
 # mining - OK
 
-input_map = "mining_active_sgu_2020_mala"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
+add_rasterize_task("mining_active_sgu_2020_mala", "p_sam_industry")
 
 # only Kristinberget
-input_map = "mining_Kristinberget"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
+add_rasterize_task("mining_Kristinberget", "p_sam_industry")
 
 
 #---------------------------------------
 # Process transport_urban data
 
-# mapset
-g.mapset(mapset = "p_sam_transport_urban")
-
-# map to align
-map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
-
-# mapset with vectors
-mapset_vector = "sam_env"
-
 #--------------
-# public roads - OK
-
-input_map = "public_roads_lm_2020"
+# public roads, private roads, railways, buildings, houses, urban - OK
+transp = ["public_roads_lm_2020", "private_roads_lm_2020", "railways_lm_2020", 
+    "buildings_lm_2020", "houses_lm_2020", "urban_lm_2020"]
 
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-#--------------
-# private roads - OK
-
-input_map = "private_roads_lm_2020"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-#--------------
-# railways - OK
-
-input_map = "railways_lm_2020"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
-
-#--------------
-# buildings, houses - OK
-urb = ["buildings_lm_2020", "houses_lm_2020"]
-
-for input_map in urb:
-    
-    print(input_map)
-        
-    # region
-    g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-    
-    # rasterize
-    v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-        value = 1, overwrite = True)
-
-#--------------
-# urban - OK
-
-input_map = "urban_lm_2020"
-
-# region
-g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-
-# rasterize
-v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-    value = 1, overwrite = True) # ideally we could have the year of operation here
+# rasterized maps and national distance maps
+for input_map in transp:
+    add_rasterize_task(input_map, "p_sam_transport_urban")
+    add_distance_task(input_map, "p_sam_transport_urban")
 
 
 #---------------------------------------
 # Process tourism data
 
-# mapset
-g.mapset(mapset = "p_sam_tourism")
-
-# map to align
-map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
-
-# mapset with vectors
-mapset_vector = "sam_env"
-
 #--------------
 # trails, snowmobile tracks - OK
 tour = ["trails_lm_2020", "snowmobile_tracks_lm_2020"]
 
+# rasterized maps and national distance maps
 for input_map in tour:
-    
-    print(input_map)
-    
-    # region
-    g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-    
-    # rasterize
-    v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-        value = 1, overwrite = True)
+    add_rasterize_task(input_map, "p_sam_tourism")
+    add_distance_task(input_map, "p_sam_tourism")
 
 #---------------------------------------
 # Process landscape data
 
-# mapset
-g.mapset(mapset = "p_sam_landscape")
-
-# map to align
-map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
-
-# mapset with vectors
-mapset_vector = "sam_env"
-
 #--------------
 # agriculture from JBV and SMD, snowmobile tracks - OK
 land = ["agriculture_JBV_2015", "agriculture_SMD_2004"]
 
 for input_map in land:
-    
-    print(input_map)
-    
-    # region
-    g.region(vector = input_map+"@"+mapset_vector, align = map_to_align, flags = "ap")
-    
-    # rasterize
-    v.to_rast(input = input_map+"@"+mapset_vector, output = input_map+"_rast", use = "val", 
-        value = 1, overwrite = True)
+    add_rasterize_task(input_map, "p_sam_landscape")
 
+#---------------------------------------
+# run only what changed since the last build
+# rasterizations and distances of the same mapset run in parallel; with unchanged vectors 
+# nothing is rasterized and no distance is computed
+run_tasks(tasks, state_file = default_state_file(), nprocs = nprocs)
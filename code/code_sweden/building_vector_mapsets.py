@@ -29,105 +29,94 @@ for i in mapset_names:
 #---------------------------------------
 # Load data
 
+# code folder
+code_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\00_grassdb\code"
+os.chdir(code_dir)
+
+# import functions
+from bulk_import import source, bulk_import
+
 # root folder
 root_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\02_vector"
 os.chdir(root_dir)
 
+# all files are listed in a manifest and imported concurrently, each one in a
+# temporary mapset, and then copied to its mapset
+# the time and size of each import are written to import_stats_vectors.csv
+
+# number of parallel imports
+nprocs = 8
+
 #---------------------------------------
 # Load data - env
 
-# mapset
-g.mapset(mapset = "sam_env")
-
 # folder
 env_dir = r"sam_env/"
 
-# load wind turbines in operation 2020 - OK
-v.in_ogr(input = env_dir+"wind_turbines_operation_Vindkraftverk_2020.shp", 
-    output = "wind_turbines_operation_2020")
-    #where = "VerkArende = 'Uppfort'")
-
-# load power lines 2020 - OK
-v.in_ogr(input = env_dir+"power_lines_Kraftledningar_vagkartan_2020.shp", output = "power_lines_lm_2020")
-
-# mining 2020
-v.in_ogr(input = env_dir+"mining_Beviljade_bearbetningskoncessioner_2020.shp", 
-    output = "mining_sgu_2020")
-
-# mining signature 2020
-v.in_ogr(input = env_dir+"mining_signature_Beviljade_markkoncessioner_2020.shp", 
-    output = "mining_signature_sgu_2020")
-
-# mining - active areas 2020 - OK
-v.in_ogr(input = env_dir+"mining_active_2020.gpkg", 
-    output = "mining_active_sgu_2020_mala")
-
-# load large public roads 2020 - OK
-v.in_ogr(input = env_dir+"public_roads_Allmanna_vagar_2020.shp", output = "public_roads_lm_2020")
-
-# load private roads 2020 - OK
-v.in_ogr(input = env_dir+"private_roads_Ovriga_vagar_2020.shp", output = "private_roads_lm_2020")
-
-# load railways 2020 - OK
-v.in_ogr(input = env_dir+"railways_Jarnvagar_vagkartan_2020.shp", output = "railways_lm_2020")
-
-# load buildings 2020 - OK
-v.in_ogr(input = env_dir+"buildings_Byggnader_2020.shp", output = "buildings_lm_2020",
-    overwrite = True)
-
-# load houses 2020 - OK
-v.in_ogr(input = env_dir+"houses_Hus_2020.shp", output = "houses_lm_2020")
-
-# load urban 2020 - OK
-v.in_ogr(input = env_dir+"urban_Bebyggelseomrade_vagkartan_2020.shp", output = "urban_lm_2020")
-
-# trails 2020 - OK
-v.in_ogr(input = env_dir+"trails_Stigar_och_leder_oversiktskartan_2020.shp", 
-    output = "trails_lm_2020")
-
-# snowmobile tracks 2020 - OK
-v.in_ogr(input = env_dir+"snow_mobile_trails_Skoterleder_i_fjallen_fjallkartan_2020.shp", 
-    output = "snowmobile_tracks_lm_2020")
-
-# agriculture 2015 - JBV - OK
-v.in_ogr(input = env_dir+"agriculture_Jordbruksmark_JBV.gpkg", 
-    output = "agriculture_JBV_2015")
-
-# agriculture 2004 - SMD - OK
-v.in_ogr(input = env_dir+"agriculture_Jordbruksmark_SMD.gpkg", 
-    output = "agriculture_SMD_2004")
-
-# clearcuts 2020 - SKS - OK
-v.in_ogr(input = env_dir+"clear_cuts_Utford_avverkning_SKS.gpkg", 
-    output = "clear_cuts_SKS_2020", overwrite = True)
-
+manifest = [
+    # load wind turbines in operation 2020 - OK
+    source(env_dir+"wind_turbines_operation_Vindkraftverk_2020.shp", "wind_turbines_operation_2020", 
+        "sam_env"), #where = "VerkArende = 'Uppfort'")
+    # load power lines 2020 - OK
+    source(env_dir+"power_lines_Kraftledningar_vagkartan_2020.shp", "power_lines_lm_2020", "sam_env"),
+    # mining 2020
+    source(env_dir+"mining_Beviljade_bearbetningskoncessioner_2020.shp", "mining_sgu_2020", "sam_env"),
+    # mining signature 2020
+    source(env_dir+"mining_signature_Beviljade_markkoncessioner_2020.shp", "mining_signature_sgu_2020", 
+        "sam_env"),
+    # mining - active areas 2020 - OK
+    source(env_dir+"mining_active_2020.gpkg", "mining_active_sgu_2020_mala", "sam_env"),
+    # load large public roads 2020 - OK
+    source(env_dir+"public_roads_Allmanna_vagar_2020.shp", "public_roads_lm_2020", "sam_env"),
+    # load private roads 2020 - OK
+    source(env_dir+"private_roads_Ovriga_vagar_2020.shp", "private_roads_lm_2020", "sam_env"),
+    # load railways 2020 - OK
+    source(env_dir+"railways_Jarnvagar_vagkartan_2020.shp", "railways_lm_2020", "sam_env"),
+    # load buildings 2020 - OK
+    source(env_dir+"buildings_Byggnader_2020.shp", "buildings_lm_2020", "sam_env"),
+    # load houses 2020 - OK
+    source(env_dir+"houses_Hus_2020.shp", "houses_lm_2020", "sam_env"),
+    # load urban 2020 - OK
+    source(env_dir+"urban_Bebyggelseomrade_vagkartan_2020.shp", "urban_lm_2020", "sam_env"),
+    # trails 2020 - OK
+    source(env_dir+"trails_Stigar_och_leder_oversiktskartan_2020.shp", "trails_lm_2020", "sam_env"),
+    # snowmobile tracks 2020 - OK
+    source(env_dir+"snow_mobile_trails_Skoterleder_i_fjallen_fjallkartan_2020.shp", 
+        "snowmobile_tracks_lm_2020", "sam_env"),
+    # agriculture 2015 - JBV - OK
+    source(env_dir+"agriculture_Jordbruksmark_JBV.gpkg", "agriculture_JBV_2015", "sam_env"),
+    # agriculture 2004 - SMD - OK
+    source(env_dir+"agriculture_Jordbruksmark_SMD.gpkg", "agriculture_SMD_2004", "sam_env"),
+    # clearcuts 2020 - SKS - OK
+    source(env_dir+"clear_cuts_Utford_avverkning_SKS.gpkg", "clear_cuts_SKS_2020", "sam_env")]
 
 #---------------------------------------
 # Load data - ancillary
 
-# mapset
-g.mapset(mapset = "sam_reindeer_ancillary")
-
 # folder
 ancillary_dir = r"sam_reindeer_ancillary/"
 
-# load general availability data for Mittadalen herding district - OK
-v.in_ogr(input = ancillary_dir+"availability_general_mittadalen.shp", output = "availability_general_mittadalen")
-
-# load more strict availability ara for Mittadalen herding district - OK
-v.in_ogr(input = ancillary_dir+"availability_mittadalen_herding_line_6.shp", output = "availability_mittadalen_herding_line_6")
-
-# load general availability data for Tassasen herding district - OK
-v.in_ogr(input = ancillary_dir+"availability_general_Tassasen.shp", output = "availability_general_tassasen")
-
-# load general availability data for Mala herding district until July (fence) - OK
-v.in_ogr(input = ancillary_dir+"availability_mala_calving_summer.gpkg", output = "availability_mala_calving_summer")
-# late summer - OK
-v.in_ogr(input = ancillary_dir+"availability_mala_late_summer.gpkg", output = "availability_mala_late_summer")
-# autumn - OK
-v.in_ogr(input = ancillary_dir+"availability_mala_autumn.gpkg", output = "availability_mala_autumn")
-
-
-
+manifest += [
+    # load general availability data for Mittadalen herding district - OK
+    source(ancillary_dir+"availability_general_mittadalen.shp", "availability_general_mittadalen", 
+        "sam_reindeer_ancillary"),
+    # load more strict availability ara for Mittadalen herding district - OK
+    source(ancillary_dir+"availability_mittadalen_herding_line_6.shp", 
+        "availability_mittadalen_herding_line_6", "sam_reindeer_ancillary"),
+    # load general availability data for Tassasen herding district - OK
+    source(ancillary_dir+"availability_general_Tassasen.shp", "availability_general_tassasen", 
+        "sam_reindeer_ancillary"),
+    # load general availability data for Mala herding district until July (fence) - OK
+    source(ancillary_dir+"availability_mala_calving_summer.gpkg", "availability_mala_calving_summer", 
+        "sam_reindeer_ancillary"),
+    # late summer - OK
+    source(ancillary_dir+"availability_mala_late_summer.gpkg", "availability_mala_late_summer", 
+        "sam_reindeer_ancillary"),
+    # autumn - OK
+    source(ancillary_dir+"availability_mala_autumn.gpkg", "availability_mala_autumn", 
+        "sam_reindeer_ancillary")]
 
+#---------------------------------------
+# Import
 
+bulk_import(manifest, nprocs = nprocs, stats_file = "import_stats_vectors.csv")
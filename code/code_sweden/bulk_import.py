@@ -0,0 +1,277 @@
+import os
+import csv
+import json
+import glob
+import hashlib
+import time
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import grass.script as grass
+from grass.pygrass.modules.shortcuts import general as g
+
+from parallel_grass import run_parallel
+from build_tasks import file_hash
+from convert_decimal_comma import source_stat
+
+# function to define one file to be imported
+#   input: file to import; output: name of the map
+#   mapset: mapset where the map is imported (None for the current mapset)
+#   module: import module (v.in.ogr, r.in.gdal, r.import, ...)
+#   external: if True, raster files are linked with r.external instead of imported
+#   tiled: for linked files, "cog" or "tiled" to link a tiled copy of the file (see
+#          convert_tiled), so that reading a window of the map does not read whole strips
+#   other parameters are passed to the module
+def source(input = "", output = "", mapset = None, module = "v.in.ogr", external = False,
+    tiled = None, **kwargs):
+
+    src = {"input": input, "output": output, "mapset": mapset, "module": module,
+        "external": external, "tiled": tiled}
+    src["params"] = kwargs
+    return src
+
+# function to read a manifest file, a csv with the columns mapset, input, output and,
+# optionally, module; any other non-empty column is passed as a parameter to the module
+# relative paths are taken from the folder of the manifest
+def read_manifest(path = ""):
+
+    folder = os.path.dirname(os.path.abspath(path))
+    manifest = []
+    with open(path, "r", newline = "") as f:
+        for row in csv.DictReader(f):
+            row = {k: v for k, v in row.items() if v not in (None, "")}
+            input = os.path.join(folder, row.pop("input"))
+            manifest.append(source(input, row.pop("output"), mapset = row.pop("mapset", None),
+                module = row.pop("module", "v.in.ogr"), **row))
+    return manifest
+
+# function to get the files of a source: all files with the same name for shapefiles
+# (and other multi-file formats, e.g. .dbf, .shx and .prj), or all files in a folder
+def source_files(path = ""):
+
+    if os.path.isdir(path):
+        return sorted(os.path.join(d, i) for d, _, files in os.walk(path) for i in files)
+    files = glob.glob(glob.escape(os.path.splitext(path)[0]) + ".*")
+    return sorted(set(files + [path]))
+
+# function to get the size of a source file, in bytes
+# shapefiles (and other multi-file formats) include all files with the same name
+def source_size(path = ""):
+
+    return sum(os.path.getsize(i) for i in source_files(path))
+
+# function to get the size of a map in the current mapset, in bytes
+# for rasters, the header, the data and the support files (e.g. the null file)
+def map_size(name = "", type = "vector"):
+
+    env = grass.gisenv()
+    mapset_dir = os.path.join(env["GISDBASE"], env["LOCATION_NAME"], env["MAPSET"])
+    if type == "vector":
+        return source_size(os.path.join(mapset_dir, "vector", name))
+    files = [os.path.join(mapset_dir, element, name) for element in ("cell", "fcell", "cellhd")]
+    size = sum(os.path.getsize(i) for i in files if os.path.exists(i))
+    misc = os.path.join(mapset_dir, "cell_misc", name)
+    if os.path.isdir(misc):
+        size += source_size(misc)
+    return size
+
+# function to get the signature of a source file: size, modification time and content hash
+# of all its files (see source_files), so that e.g. a new attribute table (.dbf) or
+# projection (.prj) of a shapefile is imported again
+# the hash is only recomputed if the size or the modification time changed since the
+# signature in previous was taken
+def source_signature(path = "", previous = None):
+
+    files = source_files(path)
+    stats = [os.stat(i) for i in files]
+    sig = {"size": sum(i.st_size for i in stats), "mtime": max(i.st_mtime for i in stats),
+        "files": [os.path.basename(i) for i in files]}
+    if previous and all(previous.get(i) == sig[i] for i in ("size", "mtime", "files")):
+        sig["hash"] = previous["hash"]
+    else:
+        h = hashlib.sha256()
+        for i in files:
+            h.update((os.path.basename(i) + ":" + file_hash(i) + "\n").encode())
+        sig["hash"] = h.hexdigest()
+    return sig
+
+# function to check if a source was already imported into mapset from the same file
+# content, with the same module, parameters and mode (imported or linked)
+def is_imported(src, mapset = "", state = {}, signature = None):
+
+    element = "vector" if src["module"].startswith("v.") else "cellhd"
+    if not grass.find_file(src["output"], element = element, mapset = mapset)["file"]:
+        return False
+    previous = state.get(src["output"] + "@" + mapset)
+    return previous is not None and previous["hash"] == signature["hash"] and \
+        previous["module"] == src["module"] and previous["params"] == src["params"] and \
+        previous.get("external") == src["external"] and previous.get("tiled") == src["tiled"]
+
+# function to get the name of the tiled copy of a raster file
+def tiled_file_name(path = "", tiled = "cog"):
+
+    return os.path.splitext(path)[0] + "_" + tiled + ".tif"
+
+# function to write a tiled, compressed copy of a GeoTIFF with gdal_translate
+#   tiled: "cog" - cloud optimized GeoTIFF, tiled and with overviews (GDAL >= 3.1)
+#          "tiled" - tiled GeoTIFF, without overviews
+# the copy is written to a temporary file and moved at the end; a marker file records
+# the source that was converted, so the conversion is not run twice for the same file
+def convert_tiled(input = "", output = None, tiled = "cog", block_size = 512, compress = "DEFLATE"):
+
+    if output is None:
+        output = tiled_file_name(input, tiled)
+    marker = output + ".done"
+
+    # already converted
+    if os.path.exists(output) and os.path.exists(marker):
+        with open(marker, "r") as f:
+            if json.load(f) == source_stat(input):
+                return output
+
+    options = ["COMPRESS="+compress, "BIGTIFF=IF_SAFER", "NUM_THREADS=ALL_CPUS"]
+    if tiled == "cog":
+        # the predictor is chosen by the driver from the data type
+        options += ["BLOCKSIZE="+str(block_size), "PREDICTOR=YES"]
+        fmt = "COG"
+    else:
+        options += ["TILED=YES", "BLOCKXSIZE="+str(block_size), "BLOCKYSIZE="+str(block_size),
+            "PREDICTOR=2"]
+        fmt = "GTiff"
+
+    tmp = output + ".tmp"
+    cmd = ["gdal_translate", "-of", fmt] + [i for o in options for i in ("-co", o)] + [input, tmp]
+    try:
+        subprocess.run(cmd, check = True)
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    with open(marker, "w") as f:
+        json.dump(source_stat(input), f)
+
+    return output
+
+# function to link a raster file with r.external, in the current mapset
+# the map is only registered in the GRASS database, the data stays in the file
+# (src["link"], the tiled copy of the file, if it was converted)
+def link_raster(src):
+
+    params = dict(input = src.get("link", src["input"]), output = src["output"], overwrite = True)
+    params.update(src["params"])
+    grass.run_command("r.external", quiet = True, **params)
+
+# function to get the job importing one source
+# vectors are imported in a temporary mapset and copied to the target mapset, since
+# v.in.ogr writes the attribute tables to the sqlite database of the mapset, which
+# does not support concurrent writes; rasters have no database, and are imported
+# directly in the target mapset, so they are written only once
+def import_job(src):
+
+    type = "vector" if src["module"].startswith("v.") else "raster"
+    params = dict(input = src["input"], output = src["output"], overwrite = True)
+    params.update(src["params"])
+    return {"steps": [(src["module"], params)], "outputs": [src["output"]], "type": type,
+        "in_place": type == "raster", "source": src}
+
+# function to print the statistics of the imports, from the slowest to the fastest
+def report_imports(stats = []):
+
+    print("time (s)  merge (s)  source (MB)  grass (MB)  map")
+    for i in sorted(stats, key = lambda x: -x["time"]):
+        print("%8.1f  %9.1f  %11.1f  %10.1f  %s@%s" % (i["time"], i["merge_time"],
+            i["source_size"] / 2**20, i["map_size"] / 2**20, i["output"], i["mapset"]))
+    print("total: %.1f s" % sum(i["time"] + i["merge_time"] for i in stats))
+
+# function to import many files concurrently
+# the mapsets are processed one at a time, and only the maps of the current mapset are
+# written at the same time; each vector file is imported in its own temporary mapset and
+# copied to its mapset as the import finishes, and raster files are imported directly in
+# their mapset (see parallel_grass.run_parallel); raster files defined as external (or all
+# raster files, if external is True) are linked with r.external, optionally through a
+# tiled copy of the file
+# if state_file is given, the signature of each imported file is stored there, and files
+# already imported from the same content are skipped (force = True imports all)
+# the time, merge time and size of each import are printed and, if stats_file is given,
+# written to a csv file
+def bulk_import(manifest = [], nprocs = 4, stats_file = None, state_file = None,
+    external = None, force = False):
+
+    # signatures from previous runs
+    state = {}
+    if state_file is not None and os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            state = json.load(f)
+
+    # group by mapset
+    mapsets = {}
+    for src in manifest:
+        mapset = src["mapset"] or grass.gisenv()["MAPSET"]
+        mapsets.setdefault(mapset, []).append(src)
+
+    stats = []
+    for mapset, sources in mapsets.items():
+        g.mapset(mapset = mapset, flags = "c")
+
+        # skip files already imported
+        signatures = {}
+        todo = []
+        for src in sources:
+            src = dict(src)
+            if external is not None and not src["module"].startswith("v."):
+                src["external"] = external
+            if state_file is not None:
+                key = src["output"] + "@" + mapset
+                signatures[key] = source_signature(src["input"], state.get(key))
+                if not force and is_imported(src, mapset, state, signatures[key]):
+                    print("up to date: " + src["output"])
+                    continue
+            todo.append(src)
+
+        # tiled copies of the files to be linked, converted in parallel
+        convert = [src for src in todo if src["external"] and src["tiled"]]
+        with ThreadPoolExecutor(max_workers = nprocs) as executor:
+            links = executor.map(lambda src: convert_tiled(src["input"], tiled = src["tiled"]), convert)
+            for src, link in zip(convert, links):
+                src["link"] = link
+
+        # links are only registered, in the target mapset
+        jobs = []
+        for src in todo:
+            if src["external"]:
+                job = {"source": src, "outputs": [src["output"]], "type": "raster", "merge_time": 0.0}
+                start = time.perf_counter()
+                link_raster(src)
+                job["time"] = time.perf_counter() - start
+            else:
+                job = import_job(src)
+            jobs.append(job)
+
+        try:
+            run_parallel([job for job in jobs if not job["source"]["external"]], nprocs = nprocs)
+        finally:
+            # record the maps that were imported, also if some imports failed
+            for job in jobs:
+                if "merge_time" not in job:
+                    continue
+                src = job["source"]
+                key = src["output"] + "@" + mapset
+                if state_file is not None:
+                    state[key] = dict(signatures[key], module = src["module"], params = src["params"],
+                        external = src["external"], tiled = src["tiled"])
+                stats.append({"mapset": mapset, "input": src["input"], "output": src["output"],
+                    "time": job["time"], "merge_time": job["merge_time"],
+                    "source_size": source_size(src["input"]),
+                    "map_size": map_size(src["output"], job["type"])})
+            if state_file is not None:
+                with open(state_file, "w") as f:
+                    json.dump(state, f, indent = 2)
+
+    report_imports(stats)
+    if stats_file is not None and stats:
+        with open(stats_file, "w", newline = "") as f:
+            writer = csv.DictWriter(f, fieldnames = list(stats[0]))
+            writer.writeheader()
+            writer.writerows(stats)
+
+    return stats
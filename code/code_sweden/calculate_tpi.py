@@ -1,14 +1,56 @@
-from grass.pygrass.modules.shortcuts import general as g
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from grass.pygrass.modules.shortcuts import raster as r
 
-def calculate_tpi(input = "", output = "", size = 3, flags = ""):
+from raster_blocks import map_blocks, difference
+from zoi_density import circle_sum
+from temp_maps import temporary_maps
+
+# backend = "mapcalc" computes the difference with r.mapcalc, "numpy" with numpy by blocks
+def calculate_tpi(input = "", output = "", size = 3, flags = "", backend = "mapcalc"):
     
-    # name of avg dem map
-    avg_dem = "dem_avg_"+str(size)
-    # average dem within window of size = size
-    r.neighbors(input = input, output = avg_dem, size = size, flags = flags)
-    # TPI
-    r.mapcalc(expression = output+" = "+input+" - "+avg_dem)
-    # remove aux map
-    g.remove(type = "raster", name = avg_dem, flags = "f")
+    # the aux map has a unique name and is removed at the end, also on error
+    with temporary_maps() as tmp:
+        # name of avg dem map
+        avg_dem = tmp("dem_avg_"+str(size))
+        # average dem within window of size = size
+        r.neighbors(input = input, output = avg_dem, size = size, flags = flags)
+        # TPI
+        if backend == "numpy":
+            map_blocks(difference, inputs = {"input": input, "average": avg_dem}, outputs = output)
+        else:
+            r.mapcalc(expression = output+" = "+input+" - "+avg_dem)
+
+# run several calculate_tpi in parallel, in the current mapset and region
+# jobs is a list of dictionaries with the arguments of calculate_tpi
+def calculate_tpi_parallel(jobs = [], nprocs = 4):
+
+    with ThreadPoolExecutor(max_workers = nprocs) as executor:
+        futures = [executor.submit(calculate_tpi, **job) for job in jobs]
+        # raise errors, if any
+        return [i.result() for i in futures]
+
+# TPI for several window sizes in one pass over the input map
+# sizes is a dictionary {output map: window size (cells)}
+# windows are circular, as r.neighbors -c (cells within size/2 cells of the center), and
+# the averages are computed from sums along row runs (see zoi_density.circle_sum)
+# null cells are not considered in the averages
+def calculate_tpi_multiscale(input = "", sizes = {}, block_rows = 256, nthreads = 4):
+
+    outputs = list(sizes)
+    window_sizes = [sizes[i] for i in outputs]
+
+    def tpi(dem):
+        values = np.nan_to_num(dem, nan = 0.0)
+        valid = (~np.isnan(dem)).astype(np.float64)
+        out = []
+        for size in window_sizes:
+            count = circle_sum(valid, size // 2)
+            with np.errstate(invalid = "ignore", divide = "ignore"):
+                out.append(dem - np.where(count > 0, circle_sum(values, size // 2) / count, np.nan))
+        return tuple(out)
+
+    # each block is read with the rows needed for the largest window
+    map_blocks(tpi, inputs = {"dem": input}, outputs = outputs, block_rows = block_rows,
+        overlap = max(window_sizes) // 2, nthreads = nthreads)
 
@@ -0,0 +1,63 @@
+import os
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# function to get the name of the converted (sidecar) file
+# the extension is changed so that the sidecar is not listed again together with the .TXT files
+def converted_file_name(path = "", ext = ".xyz"):
+
+    return os.path.splitext(path)[0] + ext
+
+# function to get the description of a source file, stored in the marker of a converted file
+def source_stat(path = ""):
+
+    st = os.stat(path)
+    return {"source": os.path.basename(path), "size": st.st_size, "mtime": st.st_mtime}
+
+# function to replace comma by dot as decimal separator in a text file
+# the original file is kept; the file is processed in chunks and written to a sidecar
+# file, which is only put in place once complete. A marker file next to the sidecar records
+# the source that was converted, so the conversion is not run twice for the same file.
+def convert_decimal_comma(input = "", output = None, separator = ";", chunk_size = 2**24):
+
+    if output is None:
+        output = converted_file_name(input)
+    marker = output + ".done"
+
+    # already converted
+    if os.path.exists(output) and os.path.exists(marker):
+        with open(marker, "r") as f:
+            if json.load(f) == source_stat(input):
+                return output
+
+    # check the column separator, so commas are only replaced if they are decimal separators
+    with open(input, "rb") as f:
+        f.readline()
+        line = f.readline()
+    if line and separator.encode() not in line:
+        raise ValueError("File <" + input + "> does not use '" + separator + "' as column separator.")
+
+    # write to a temporary file in the same folder and move it at the end
+    fd, tmp = tempfile.mkstemp(dir = os.path.dirname(os.path.abspath(output)), suffix = ".tmp")
+    try:
+        with open(input, "rb") as fin, os.fdopen(fd, "wb") as fout:
+            for chunk in iter(lambda: fin.read(chunk_size), b""):
+                fout.write(chunk.replace(b",", b"."))
+        os.replace(tmp, output)
+    except Exception:
+        os.remove(tmp)
+        raise
+
+    with open(marker, "w") as f:
+        json.dump(source_stat(input), f)
+
+    return output
+
+# function to convert many files in parallel
+# returns the list of converted files, in the same order as the input files
+def convert_decimal_comma_files(files = [], separator = ";", nprocs = 4):
+
+    with ThreadPoolExecutor(max_workers = nprocs) as executor:
+        converted = executor.map(lambda i: convert_decimal_comma(i, separator = separator), files)
+        return list(converted)
@@ -0,0 +1,324 @@
+import os
+import json
+import hashlib
+import grass.script as grass
+from grass.pygrass.modules.shortcuts import general as g
+from grass.pygrass.modules.shortcuts import vector as v
+from grass.pygrass.modules.shortcuts import raster as r
+
+from landcover_rules import nmd_smd_rules, landcover_expression
+from temp_maps import temporary_maps
+from distance_transform import grow_distance_batch
+from export_maps import export_maps, build_vrt, export_multiband
+from viewshed import turbine_points, cumulative_viewshed
+from build_tasks import default_state_file, input_signature
+from bulk_import import map_size
+
+# function to define a layer to be cut for a study area
+#   map: name of the input map, or pattern: pattern to list input maps in the mapset
+#   mapset: mapset of the input map(s)
+#   name: name of the output map, or rename: function to get the output name from the input name
+#   operation: "copy" - the map is just cut
+#              "distance" - distance from the non-null cells of the map, within the study area;
+#                           for features spread over the country, cut the national
+#                           distance map instead (copy)
+#              "landcover" - land cover reclassified and harmonized with SMD; computed once
+#                            for all study areas with the same definition, then cut
+#              "patch" - the nulls of the map are filled with another layer of the study area (fill)
+def layer(map = None, mapset = "", name = None, operation = "copy", pattern = None,
+    rename = None, **kwargs):
+
+    lyr = {"map": map, "pattern": pattern, "mapset": mapset, "name": name or map,
+        "rename": rename, "operation": operation}
+    lyr.update(kwargs)
+    return lyr
+
+# function to expand the layers defined by a pattern into one layer per map
+# the mapsets of the layers must be in the search path of the current mapset
+def expand_layers(layers):
+
+    expanded = []
+    for lyr in layers:
+        if lyr["pattern"] is None:
+            maps = [lyr["map"]]
+        else:
+            maps = grass.list_grouped(type = "raster", pattern = lyr["pattern"]).get(lyr["mapset"], [])
+        for i in maps:
+            new = dict(lyr, map = i, pattern = None)
+            if lyr["rename"] is not None:
+                new["name"] = lyr["rename"](i)
+            elif lyr["pattern"] is not None:
+                new["name"] = i
+            expanded.append(new)
+
+    return expanded
+
+# function to set the region and mask of a study area in its mapset
+def set_study_area(area, map_to_align = ""):
+
+    g.mapset(mapset = area["mapset"], flags = "c")
+    # mapsets with input maps
+    mapsets = sorted(set(lyr["mapset"] for lyr in area["layers"]))
+    g.mapsets(mapset = mapsets, operation = "add")
+    # region
+    g.region(vector = area["availability_vector"], align = map_to_align, flags = "ap")
+    # mask
+    r.mask(vector = area["availability_vector"], overwrite = True)
+
+# mapset with the layers shared by the study areas
+shared_mapset = "cut_maps_shared"
+
+# parameters defining the transformation of the layers computed once and shared by
+# the study areas, for each operation
+shared_params = {"landcover": ("rules", "smd", "urban", "agriculture")}
+
+# function to get the name of a shared layer, from its definition: the input map, the
+# operation and its parameters, and the map the region is aligned to
+# study areas with the same definition of a layer share the same map
+def shared_name(lyr, map_to_align = ""):
+
+    definition = {"map": lyr["map"]+"@"+lyr["mapset"], "operation": lyr["operation"],
+        "align": map_to_align}
+    definition.update({i: lyr[i] for i in shared_params[lyr["operation"]]})
+    key = hashlib.sha1(json.dumps(definition, sort_keys = True).encode()).hexdigest()
+    return lyr["name"] + "_" + key[:10]
+
+# function to compute the reclassified and harmonized land cover map
+# the NMD map is reclassified (r.reclass, no data written) and the harmonization rules
+# with SMD and other maps are applied in a single r.mapcalc pass
+def landcover_map(lyr, output = ""):
+
+    with temporary_maps() as tmp:
+        # reclassify
+        reclassified = tmp("reclass_" + lyr["map"])
+        r.reclass(input = lyr["map"]+"@"+lyr["mapset"], output = reclassified,
+            rules = lyr["rules"], overwrite = True)
+        # harmonize with SMD, urban areas and agriculture
+        rules = nmd_smd_rules(smd = lyr["smd"], urban = lyr["urban"], agriculture = lyr["agriculture"])
+        r.mapcalc(landcover_expression(output, reclassified, rules), overwrite = True)
+
+# function to compute the layers shared by the study areas
+# each layer is computed once, in the region covering all study areas using it, and is
+# only computed again if its inputs or its region changed since the last run (the state
+# is kept in state_file, in the location folder by default)
+# the name of the shared map is stored in the layer (lyr["shared"])
+def prepare_shared_layers(areas, map_to_align = "", state_file = None):
+
+    if state_file is None:
+        state_file = default_state_file("shared_layers.json")
+
+    # layers with the same definition, and the study areas using them
+    shared = {}
+    for area in areas:
+        for lyr in area["layers"]:
+            if lyr["operation"] in shared_params:
+                lyr["shared"] = shared_name(lyr, map_to_align)
+                shared.setdefault(lyr["shared"], {"layer": lyr, "vectors": []})
+                shared[lyr["shared"]]["vectors"].append(area["availability_vector"])
+    if not shared:
+        return
+
+    state = {}
+    if os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            state = json.load(f)
+
+    g.mapset(mapset = shared_mapset, flags = "c")
+    for name in shared:
+        lyr = shared[name]["layer"]
+        g.region(vector = sorted(set(shared[name]["vectors"])), align = map_to_align, flags = "ap")
+        region = grass.region()
+
+        # inputs and region of the map
+        inputs = [lyr["map"]+"@"+lyr["mapset"]]
+        for i in shared_params[lyr["operation"]]:
+            inputs += lyr[i] if isinstance(lyr[i], list) else [lyr[i]]
+        signature = {"region": [region[i] for i in ("n", "s", "e", "w", "nsres", "ewres")],
+            "inputs": {i: input_signature(i) for i in inputs}}
+        exists = grass.find_file(name, element = "cellhd", mapset = shared_mapset)["file"]
+        if exists and state.get(name) == signature:
+            print("shared layer up to date: " + name)
+            continue
+
+        print("shared layer: " + name + " (" + ", ".join(shared[name]["vectors"]) + ")")
+        landcover_map(lyr, output = name)
+        state[name] = signature
+        with open(state_file, "w") as f:
+            json.dump(state, f, indent = 2)
+
+# function to cut and prepare the layers of a study area
+# modules read the input maps directly from their mapsets, under the region and MASK
+# of the study area, so only the final maps are written
+# returns the size on disk of each map written and, for each input that was copied to a
+# temporary map before (distance and patch layers), the size on disk of that copy; the
+# copies are only written and measured if area["measure_copies"] is True (None otherwise)
+def cut_layers(area):
+
+    layers = expand_layers(area["layers"])
+
+    # maps used to fill other maps are cut first
+    layers = sorted(layers, key = lambda lyr: lyr["operation"] == "patch")
+
+    written = {}
+    copies = {}
+
+    # temporary copy of an input, as written by the previous version of the cut
+    def measure_copy(source):
+        copies[source] = None
+        if area.get("measure_copies"):
+            with temporary_maps() as tmp:
+                copy = tmp("copy")
+                r.mapcalc(copy+" = "+source, overwrite = True)
+                copies[source] = map_size(copy, "raster")
+
+    # distances computed with r.grow_distance, or from all sources in one batch with the
+    # EDT engine if area["distance_engine"] = "edt" (see benchmark_distance_transform.py)
+    engine = area.get("distance_engine", "r.grow_distance")
+    if engine == "edt":
+        distances = {lyr["map"]+"@"+lyr["mapset"]: lyr["name"] for lyr in layers
+            if lyr["operation"] == "distance"}
+        grow_distance_batch(distances)
+        for source, name in distances.items():
+            written[name] = map_size(name, "raster")
+            measure_copy(source)
+
+    for lyr in layers:
+
+        if lyr["operation"] in shared_params:
+            source = lyr["shared"]+"@"+shared_mapset
+        else:
+            source = lyr["map"]+"@"+lyr["mapset"]
+
+        # cut the map
+        if lyr["operation"] in ("copy", "landcover"):
+            expression = lyr["name"]+" = "+source
+            r.mapcalc(expression, overwrite = True)
+
+        # calculate distance
+        if lyr["operation"] == "distance":
+            if engine == "edt":
+                continue
+            r.grow_distance(input = source, distance = lyr["name"],
+                overwrite = True)
+            measure_copy(source)
+
+        # land use map
+        if lyr["operation"] == "landcover":
+            # colors
+            r.colors(map = lyr["name"], raster = lyr["map"]+"@"+lyr["mapset"])
+            # classes
+            r.category(map = lyr["name"], rules = lyr["categories"], separator = "comma")
+            # report
+            r.report(map = lyr["name"], units = ["k", "p"], flags = "n",
+                output = lyr["report"], overwrite = True) #sort = "desc")
+
+        # complete map for animals that leave the limits of the sameby
+        if lyr["operation"] == "patch":
+            maps_to_patch = (source, lyr["fill"])
+            r.patch(input = maps_to_patch, output = lyr["name"], overwrite = True)
+            measure_copy(source)
+
+        written[lyr["name"]] = map_size(lyr["name"], "raster")
+
+    return written, copies
+
+# function to report the data written when cutting a study area, measured on disk
+# (header, data and null files of the maps), and the data the temporary copies of the
+# previous version of the cut would have added, if they were measured
+def report_io(area, written = {}, copies = {}):
+
+    size = sum(written.values())
+    print("study area " + area["mapset"] + ": " + str(len(written)) + " maps written, " +
+        str(round(size / 2**20, 1)) + " MB on disk")
+    if copies and all(i is not None for i in copies.values()):
+        before = size + sum(copies.values())
+        print("  before, with " + str(len(copies)) + " temporary copies: " +
+            str(round(before / 2**20, 1)) + " MB (" + str(round(100.0 * (before - size) / max(before, 1), 1)) +
+            "% less)")
+    elif copies:
+        print("  temporary copies avoided: " + str(len(copies)) +
+            " (set measure_copies to measure their size)")
+
+# function to compute the cumulative viewshed of the wind parks in a study area
+# the turbines of all parks are processed in parallel (see viewshed.cumulative_viewshed)
+# the viewshed of each turbine is kept in viewshed_cache, in the location folder, so that
+# when turbines are added or removed only these are computed and the count maps updated;
+# the cache is keyed by the version of vs["dem"], so it should be the national DEM and not
+# a map cut for the study area, which is written again by every cut
+def make_viewsheds(area, nprocs = 4):
+
+    vs = area["viewshed"]
+
+    # select only turbines within the availability area
+    output_turb1 = "turbines_within_aux"
+    v.select(ainput = vs["turbines"], binput = area["availability_vector"],
+        output = output_turb1, operator = "intersects", overwrite = True)
+
+    # turbines of each of the wind parks
+    parks = []
+    for park in vs["parks"]:
+        if park.get("code") is None:
+            where = None
+        else:
+            where = "Omrades_ID = '"+park["code"]+"'"
+        parks.append(dict(park, turbines = turbine_points(output_turb1, where = where)))
+
+    # cumulative viewshed, binary viewshed of each park and general viewshed layer
+    # (binary: seen from more than one turbine, as in the previous r.viewshed_cva maps)
+    cumulative_viewshed(parks, dem = vs["dem"], target_height = vs["reindeer_height"],
+        threshold = 1, combined = vs.get("combined"), nprocs = nprocs,
+        cache_dir = vs.get("cache_dir", default_state_file("viewshed_cache")))
+
+    # remove intermediate files
+    g.remove(type = "vector", pattern = "turbines_within*", flags = "f")
+
+# function to export all maps of the study area
+# the region is set once and the maps are exported concurrently by nprocs processes
+# area["package"] may be "vrt", to also write a VRT with one band per map, or "multiband",
+# to also write a single multiband GeoTIFF, both named after the mapset
+def export_study_area(area, map_to_align = "", nprocs = 4):
+
+    export = grass.list_grouped(type = "raster", pattern = "*")[area["mapset"]]
+    if "MASK" in export:
+        export.remove("MASK")
+
+    # region
+    g.region(vector = area["availability_vector"],
+        align = map_to_align, flags = "ap")
+
+    # export
+    files = export_maps(export, output_dir = area["out_dir"], nprocs = nprocs, overviews = 0)
+
+    # single product for the analyses
+    if area.get("package") == "vrt":
+        build_vrt(files, os.path.join(area["out_dir"], area["mapset"]+".vrt"))
+    if area.get("package") == "multiband":
+        export_multiband(export, os.path.join(area["out_dir"], area["mapset"]+".tif"))
+
+# function to cut the maps for a list of study areas
+# layers with the same definition in several study areas are computed only once
+# each study area is a dictionary with
+#   mapset: mapset where the maps of the study area are created
+#   availability_vector: vector defining the study area
+#   layers: list of layers, see layer()
+#   viewshed: definition of the wind parks for the viewshed (optional)
+#   distance_engine: "r.grow_distance" (default) or "edt", to compute the distance layers
+#   measure_copies: if True, the temporary copies of the previous version of the cut are
+#                   also written and their size reported, to measure the I/O saved (optional)
+#   out_dir: folder where the maps are exported
+#   package: "vrt" or "multiband", to also export all maps as a single product (optional)
+def cut_maps(areas, map_to_align = ""):
+
+    # layers shared between study areas
+    prepare_shared_layers(areas, map_to_align = map_to_align)
+
+    for area in areas:
+
+        print("study area: " + area["mapset"])
+
+        set_study_area(area, map_to_align = map_to_align)
+        written, copies = cut_layers(area)
+        report_io(area, written = written, copies = copies)
+        if area.get("viewshed"):
+            make_viewsheds(area)
+        export_study_area(area, map_to_align = map_to_align)
@@ -0,0 +1,183 @@
+#---------------------------------------
+# Title: Cut maps for the availability areas of the reindeer herding districts
+#   (Mala, Tassasen, Mittadalen)
+# Author: Bernardo Niebuhr
+# 2020-11-20
+#---------------------------------------
+
+python
+
+# import modules
+import os
+import grass.script as grass
+from grass.pygrass.modules.shortcuts import general as g
+from grass.pygrass.modules.shortcuts import vector as v
+from grass.pygrass.modules.shortcuts import raster as r
+
+#---------------------------------------
+# Setup
+
+# install extension r.viewshed.cva
+# g.extension(extension = "r.viewshed.cva")
+
+# code folder
+code_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\00_grassdb\code"
+os.chdir(code_dir)
+
+# import functions
+from cut_maps import layer, cut_maps
+
+# map to align
+map_to_align = "landcover_ungeneralized_nmd1_10m_2018@p_sam_landscape"
+
+# external files
+
+# folder with files for map reclassification
+landscape_dir = r"D:/bernardo/00_academico/07_projetos/05_reindeer/05_env_data/03_raster/p_sam_landscape/landcover_nmd_ungeneralized/"
+
+# folder with the analyses for each study area
+analysis_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\06_analysis"
+
+#-----------------
+# layers used in all study areas
+
+#---------
+# landscape
+
+# land cover reclassified and harmonized with SMD, computed once for all study areas
+landcover = layer("landcover_ungeneralized_nmd1_10m_2018", "p_sam_landscape", "landcover_nmd_mod", "landcover",
+    rules = landscape_dir+"nmd_classes_eng_rules_reclassify_v2.txt",
+    categories = landscape_dir+"nmd_classes_eng_reclassified.csv",
+    smd = "landcover_smd_25m_clearcuts_2007@p_sam_landscape",
+    urban = "urban_lm_2020_rast@p_sam_transport_urban",
+    agriculture = ["agriculture_JBV_2015_rast@p_sam_landscape", "agriculture_SMD_2004_rast@p_sam_landscape"])
+
+landscape = [
+    layer("landcover_smd_25m_clearcuts_2007", "p_sam_landscape", "landcover_smd_clearcuts2007"),
+    layer("clear_cuts_SKS_2020_rast", "p_sam_landscape", "clear_cuts_2020"),
+    layer("dem_10m_Sweden_2018", "p_sam_landscape", "dem_10m"),
+    layer("slope_10m_Sweden_2018", "p_sam_landscape", "dem_slope"),
+    layer("aspect_10m_Sweden_2018", "p_sam_landscape", "dem_aspect"),
+    layer(pattern = "tpi*", mapset = "p_sam_landscape", rename = lambda i: i.split("_10m")[0])]
+
+#---------
+# species
+
+# organize names of maps
+def species_name(i):
+    i = i.replace("_season", "")
+    return (i[:7] + i[-2:]) if "wolf" in i else i
+
+species = [layer(pattern = "*", mapset = "p_sam_species", rename = species_name)]
+
+#---------
+# transport_urban
+# distance maps are computed once for the whole country (building_main_location.py)
+# and only cut here
+transport_urban = [
+    layer("buildings_lm_2020_dist", "p_sam_transport_urban", "building_dist"),
+    layer("houses_lm_2020_dist", "p_sam_transport_urban", "house_dist"),
+    layer("private_roads_lm_2020_dist", "p_sam_transport_urban", "priv_road_dist"),
+    layer("public_roads_lm_2020_dist", "p_sam_transport_urban", "public_road_dist"),
+    layer("railways_lm_2020_dist", "p_sam_transport_urban", "railway_dist"),
+    layer("urban_lm_2020_dist", "p_sam_transport_urban", "urban_dist")]
+
+#---------
+# tourism
+trails = [layer("trails_lm_2020_dist", "p_sam_tourism", "trail_dist")]
+snowmobile = [layer("snowmobile_tracks_lm_2020_dist", "p_sam_tourism", "snowmob_track_dist")]
+
+#---------
+# industry
+wind = layer("wind_turbines_operation_2020_dist", "p_sam_industry", "wind_dist")
+power_lines = layer("power_lines_lm_2020_dist", "p_sam_industry", "pl_dist")
+
+# wind turbines vector
+vector_turbines = "wind_turbines_operation_2020@sam_env"
+
+# reindeer height
+reindeer_height = 1.1
+
+# DEM for the viewsheds: the national map, which is not rewritten when the study areas
+# are cut, so that the viewsheds of the turbines kept in the cache remain valid
+dem_viewshed = "dem_10m_Sweden_2018@p_sam_landscape"
+
+#-----------------
+# study areas
+
+#---------
+# Mala
+mala = {"mapset": "availability_mala",
+    "availability_vector": "availability_mala_autumn@sam_reindeer_ancillary",
+    "out_dir": os.path.join(analysis_dir, "06_analysis_Mala", "maps"),
+    "package": "vrt"}
+
+mala["layers"] = [wind,
+    layer("wind_turbines_Mala_jokk_stor_ytte", "p_sam_industry", "wind_dist_jsy", "distance"),
+    layer("wind_turbines_Mala_amliden", "p_sam_industry", "wind_dist_aml", "distance"),
+    layer("wind_turbines_Mala_jokk", "p_sam_industry", "wind_dist_jokk", "distance"),
+    layer("wind_turbines_Mala_stor", "p_sam_industry", "wind_dist_stor", "distance"),
+    layer("wind_turbines_Mala_ytte", "p_sam_industry", "wind_dist_ytte", "distance"),
+    power_lines,
+    layer("mining_active_sgu_2020_mala_rast", "p_sam_industry", "mining_dist", "distance"),
+    layer("mining_Kristinberget_rast", "p_sam_industry", "mining_dist_Krist", "distance"),
+    layer(pattern = "sound_model_mala*", mapset = "p_sam_industry")] +\
+    [dict(landcover, report = landscape_dir+"report_land_cover_mala_autumn_availability_area.txt")] +\
+    landscape + species + trails + transport_urban
+
+# names of wind parks, codes, and turbine height
+wind_parks = [("jokkmokksliden", "2418-V-007", 150.0), ("storliden", "2418-V-008", 150.0),
+    ("ytterberg", "2418-V-004", 150.0), ("amliden", "2418-V-005", 145.0),
+    ("hornberget", "2418-V-001", 125.0)]
+
+mala["viewshed"] = {"dem": dem_viewshed, "turbines": vector_turbines, "reindeer_height": reindeer_height,
+    "parks": [{"output": "viewshed_"+name+"_mala", "code": code, "height": height}
+        for name, code, height in wind_parks],
+    "combined": "viewshed_mala_binary"}
+
+#---------
+# Tassasen
+tassasen = {"mapset": "availability_tassasen",
+    "availability_vector": "availability_general_Tassasen@sam_reindeer_ancillary",
+    "out_dir": os.path.join(analysis_dir, "04_analysis_Tassasen", "maps"),
+    "package": "vrt"}
+
+tassasen["layers"] = [wind,
+    layer("wind_turbines_Mullberg", "p_sam_industry", "wind_dist_Mullberg", "distance"),
+    power_lines,
+    layer(pattern = "sound_model_tassasen*", mapset = "p_sam_industry")] +\
+    [dict(landcover, report = landscape_dir+"report_land_cover_tassasen_winter_availability_area.txt"),
+    layer("lichen_model_Sweden", "p_sam_landscape", "lichen_Sweden"),
+    # complete lichen map for animals that leave the limits of the sameby
+    layer("lichen_model_tassasen", "p_sam_landscape", "lichen", "patch", fill = "lichen_Sweden")] +\
+    landscape + species + trails + snowmobile + transport_urban
+
+tassasen["viewshed"] = {"dem": dem_viewshed, "turbines": vector_turbines,
+    "reindeer_height": reindeer_height,
+    "parks": [{"output": "viewshed_mullberg_tassasen", "code": "2326-V-015", "height": 179.0},
+        {"output": "viewshed_other_wf_tassasen", "code": "2361-V-030", "height": 81.0}],
+    "combined": "viewshed_tassasen_binary"}
+
+#---------
+# Mittadalen
+mittadalen = {"mapset": "availability_mittadalen",
+    "availability_vector": "availability_mittadalen_herding_line_6@sam_reindeer_ancillary",
+    "out_dir": os.path.join(analysis_dir, "05_analysis_Mittadalen", "maps"),
+    "package": "vrt"}
+
+mittadalen["layers"] = [wind, power_lines,
+    layer(pattern = "sound_model_mittadalen*", mapset = "p_sam_industry")] +\
+    [dict(landcover, report = landscape_dir+"report_land_cover_mittadalen_winter_availability_area.txt"),
+    layer("lichen_model_Sweden", "p_sam_landscape", "lichen_Sweden"),
+    # complete lichen map for animals that leave the limits of the sameby
+    layer("lichen_model_mittadalen", "p_sam_landscape", "lichen", "patch", fill = "lichen_Sweden")] +\
+    landscape + species + trails + snowmobile + transport_urban
+
+# all turbines within the area
+mittadalen["viewshed"] = {"dem": dem_viewshed, "turbines": vector_turbines,
+    "reindeer_height": reindeer_height,
+    "parks": [{"output": "viewshed_mittadalen", "code": None, "height": 125.0}]}
+
+#---------------------------------------
+# cut maps for all study areas
+cut_maps([mala, tassasen, mittadalen], map_to_align = map_to_align)
@@ -0,0 +1,164 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import grass.script as grass
+
+from raster_blocks import read_map, empty_map, write_map, remove_files, row_blocks
+
+# exact Euclidean distance transform (Felzenszwalb & Huttenlocher 2012, Meijster et al. 2000)
+# in two separable passes, both linear in the number of cells:
+#   1. along columns: distance in rows to the nearest source cell in the same column
+#   2. along rows: lower envelope of the parabolas defined by the distances of pass 1
+# each pass is vectorised over many columns (pass 1) or rows (pass 2) at a time
+
+# pass 1: squared distance (in map units) to the nearest source in the same column
+# source is a boolean array (rows, cols); cells with no source in the column are inf
+def column_distance(source, nsres = 1.0):
+
+    rows, cols = source.shape
+    dist = np.empty((rows, cols), dtype = np.float64)
+
+    # distance to the nearest source above (including the cell)
+    last = np.full(cols, -np.inf)
+    for i in range(rows):
+        last = np.where(source[i], i, last)
+        dist[i] = i - last
+
+    # distance to the nearest source below
+    last = np.full(cols, np.inf)
+    for i in range(rows - 1, -1, -1):
+        last = np.where(source[i], i, last)
+        np.minimum(dist[i], last - i, out = dist[i])
+
+    return (dist * nsres)**2
+
+# pass 2: squared distance along each row, from the squared column distances f
+# lower envelope of the parabolas (x - q)^2 + f(q), vectorised over the rows of f
+def row_distance(f, ewres = 1.0):
+
+    rows, cols = f.shape
+    idx = np.arange(rows)
+    x = np.arange(cols) * ewres
+
+    # for each row: positions (v) of the parabolas in the envelope, the boundaries (z)
+    # between them, and the number of parabolas (k + 1)
+    v = np.zeros((rows, cols), dtype = np.int64)
+    z = np.full((rows, cols + 1), np.inf)
+    z[:, 0] = -np.inf
+    k = np.zeros(rows, dtype = np.int64)
+    # rows without any finite value yet have no parabola in the envelope
+    started = np.isfinite(f[:, 0])
+
+    for q in range(1, cols):
+        fq = f[:, q]
+        finite = np.isfinite(fq)
+        # first finite parabola of the row
+        first = finite & ~started
+        v[first, 0] = q
+        started |= finite
+        active = finite & ~first
+        # remove the parabolas hidden by the new one, then add it to the envelope
+        # (z[k = 0] is -inf, so the first parabola is never removed)
+        while active.any():
+            rr = idx[active]
+            vk = v[rr, k[rr]]
+            s = ((fq[rr] + x[q]**2) - (f[rr, vk] + x[vk]**2)) / (2 * (x[q] - x[vk]))
+            pop = s <= z[rr, k[rr]]
+            k[rr[pop]] -= 1
+            add_parabola(v, z, k, rr[~pop], q, s[~pop])
+            active[rr[~pop]] = False
+
+    # distances from the envelope
+    out = np.empty((rows, cols), dtype = np.float64)
+    j = np.zeros(rows, dtype = np.int64)
+    for q in range(cols):
+        # move to the parabola covering q
+        while True:
+            move = z[idx, j + 1] < x[q]
+            if not move.any():
+                break
+            j[move] += 1
+        vj = v[idx, j]
+        out[:, q] = (x[q] - x[vj])**2 + f[idx, vj]
+
+    # rows without sources
+    out[~started] = np.inf
+
+    return out
+
+# function to add the parabola at position q to the envelope of the given rows
+# s is the boundary between the last parabola of the envelope and the new one
+def add_parabola(v, z, k, rows, q, s):
+
+    if len(rows) == 0:
+        return
+    k[rows] += 1
+    v[rows, k[rows]] = q
+    z[rows, k[rows]] = s
+    z[rows, k[rows] + 1] = np.inf
+
+# function to compute the exact Euclidean distance (map units) to the non-null cells of an array
+# the column pass is run by stripes of columns and the row pass by blocks of rows,
+# in parallel; each stripe/block spans the whole array, so the result is exact
+def distance_transform(array, nsres = 1.0, ewres = 1.0, block_size = 1024, nthreads = 4):
+
+    rows, cols = array.shape
+    f = np.empty((rows, cols), dtype = np.float64)
+    out = np.empty((rows, cols), dtype = np.float32)
+
+    def columns(block):
+        c0, c1 = block
+        f[:, c0:c1] = column_distance(~np.isnan(array[:, c0:c1]), nsres = nsres)
+
+    def lines(block):
+        r0, r1 = block
+        out[r0:r1] = np.sqrt(row_distance(f[r0:r1], ewres = ewres))
+
+    with ThreadPoolExecutor(max_workers = nthreads) as executor:
+        list(executor.map(columns, row_blocks(cols, block_size)))
+        list(executor.map(lines, row_blocks(rows, block_size)))
+
+    # no sources at all
+    out[np.isinf(out)] = np.nan
+
+    return out
+
+# function to compute the distance to the non-null cells of several maps in one run,
+# as r.grow_distance (distance output, Euclidean metric), in the current region and MASK
+# maps is a dictionary {input map: output map}
+# the maps are processed one after another, each one in parallel by nthreads threads
+def grow_distance_batch(maps = {}, block_size = 1024, nthreads = 4, overwrite = True):
+
+    region = grass.region()
+
+    for input, output in maps.items():
+        print(input + " -> " + output)
+        array = read_map(input)
+        result = empty_map("FCELL")
+        result[:] = distance_transform(array, nsres = region["nsres"], ewres = region["ewres"],
+            block_size = block_size, nthreads = nthreads)
+        write_map(result, output, "FCELL", overwrite = overwrite)
+        filenames = [array.filename, result.filename]
+        del array, result
+        remove_files(filenames)
+
+    return list(maps.values())
+
+# function to compare the time of r.grow_distance and grow_distance_batch for several maps
+# the r.grow_distance outputs are named output+"_grow"
+def benchmark_distance(maps = {}, **kwargs):
+
+    start = time.perf_counter()
+    for input, output in maps.items():
+        grass.run_command("r.grow.distance", input = input, distance = output+"_grow",
+            overwrite = True, quiet = True)
+    time_grow = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grow_distance_batch(maps, **kwargs)
+    time_edt = time.perf_counter() - start
+
+    print(str(len(maps)) + " maps: r.grow.distance " + str(round(time_grow, 2)) + " s, EDT " +
+        str(round(time_edt, 2)) + " s")
+
+    return {"r.grow.distance": time_grow, "edt": time_edt}
@@ -13,6 +13,13 @@ from grass.pygrass.modules.shortcuts import general as g
 from grass.pygrass.modules.shortcuts import vector as v
 from grass.pygrass.modules.shortcuts import raster as r
 
+# code folder
+code_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\00_grassdb\code"
+os.chdir(code_dir)
+
+# import functions
+from landcover_rules import nmd_smd_rules, landcover_expression
+
 # make sure extensions used are installed
 #g.extension(extension = "r.fill.gaps")
 
@@ -94,22 +101,16 @@ r.colors(map = "landcover_ungeneralized_nmd1_10m_2018_mittadalen_reclass",
 
 input_nmd = "landcover_ungeneralized_nmd1_10m_2018_mittadalen_reclass"
 input_smd = "landcover_smd_mittadalen_explore"
-# replace tundra from NMD (41) by rocks/tundra from SMD (59)  
-exp = "map_landcover_aux1 = if("+input_nmd+" == 41 && "+input_smd+" == 59, 201, "+input_nmd+")"
+# rules: replace tundra from NMD (41) by rocks/tundra from SMD (59),
+# replace other open land from NMD (42) by heath from SMD (52),
+# clasify ski slopes (17) and urban areas as anthropogenic,
+# merge what remains as 41 and 42 as 41 = other open lands,
+# in other open lands (41), if there is agriculture SMD or JBM, consider as arable lands (3)
+rules = nmd_smd_rules(smd = input_smd, urban = urban, agriculture = [agriculture_jvb, agriculture_smd])
+# all rules in a single pass
+exp = landcover_expression("landcover_ungeneralized_nmd1_10m_2018_mittadalen_reclass_nmd_smd", 
+    input_nmd, rules)
 r.mapcalc(exp, overwrite = True)
-# replace other open land from NMD (42) by heath from SMD (52)  
-exp2 = "map_landcover_aux2 = if(map_landcover_aux1 == 42 && "+input_smd+" == 52, 202, map_landcover_aux1)"
-r.mapcalc(exp2, overwrite = True)
-# clasify ski slopes (17) and urban areas as anthropogenic
-exp3 = "map_landcover_aux3 = if(!isnull("+urban+") || "+input_smd+" == 17, 51, map_landcover_aux2)"
-r.mapcalc(exp3, overwrite = True)
-# merge what remains as 41 and 42 as 41 = other open lands
-exp4 = "map_landcover_aux4 = if(map_landcover_aux3 == 42, 41, map_landcover_aux3)"
-r.mapcalc(exp4, overwrite = True)
-# in other open lands (41), if there is agriculture SMD or JBM, consider as arable lands (2)
-exp5 = "landcover_ungeneralized_nmd1_10m_2018_mittadalen_reclass_nmd_smd = if(map_landcover_aux4 == 41 && \
-(!isnull("+agriculture_jvb+") || !isnull("+agriculture_smd+")), 3, map_landcover_aux4)"
-r.mapcalc(exp5, overwrite = True)
 
 # classes
 r.category(map = "landcover_ungeneralized_nmd1_10m_2018_mittadalen_reclass_nmd_smd",
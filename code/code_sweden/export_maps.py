@@ -0,0 +1,115 @@
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+import grass.script as grass
+
+# GDAL type and GeoTIFF predictor for each type of GRASS raster map
+# (2: horizontal differencing, for integers; 3: floating point)
+# CELL maps are written with the smallest integer type holding their values (see gdal_type)
+export_types = {"CELL": ("Int32", 2), "FCELL": ("Float32", 3), "DCELL": ("Float64", 3)}
+
+# GDAL integer types, from the smallest, with the range of values they hold
+# the value used by r.out.gdal as nodata for the type is left out of the range
+integer_types = [("Byte", 0, 254), ("UInt16", 0, 65534), ("Int16", -32767, 32767),
+    ("UInt32", 0, 4294967294), ("Int32", -2147483647, 2147483647)]
+
+# function to get the GDAL type to export one or several maps (bands) with
+# floating point maps keep their type (the widest among the maps); integer maps get the
+# smallest integer type holding the range of all maps (r.info -r), e.g. Byte for classes
+def gdal_type(maps = [], env = None):
+
+    if isinstance(maps, str):
+        maps = [maps]
+    datatypes = [grass.raster_info(i, env = env)["datatype"] for i in maps]
+    datatype = max(datatypes, key = list(export_types).index)
+    if datatype != "CELL":
+        return export_types[datatype][0]
+
+    ranges = [grass.parse_command("r.info", map = i, flags = "r", env = env) for i in maps]
+    # maps with only nulls have no range
+    values = [int(i[k]) for i in ranges for k in ("min", "max") if i[k] != "NULL"]
+    if not values:
+        return integer_types[0][0]
+    for name, low, high in integer_types:
+        if low <= min(values) and max(values) <= high:
+            return name
+    return export_types["CELL"][0]
+
+# function to get the creation options of a tiled, compressed GeoTIFF
+# the predictor is chosen from the type of the map, unless predictor is False
+# interleave "PIXEL" keeps the values of all bands of a cell together (multiband files)
+def geotiff_options(datatype = "FCELL", compress = "DEFLATE", block_size = 512, predictor = True,
+    tfw = True, interleave = None):
+
+    options = ["TILED=YES", "BLOCKXSIZE="+str(block_size), "BLOCKYSIZE="+str(block_size),
+        "COMPRESS="+compress, "BIGTIFF=IF_SAFER"]
+    if interleave:
+        options.append("INTERLEAVE="+interleave)
+    if predictor:
+        options.append("PREDICTOR="+str(export_types[datatype][1]))
+    if tfw:
+        options.append("TFW=YES")
+    return ",".join(options)
+
+# function to export a raster map to a tiled, compressed GeoTIFF with overviews, in one pass
+# the map is exported in the current region (or the region defined in env)
+def export_map(input = "", output = "", overviews = 4, env = None, **kwargs):
+
+    datatype = grass.raster_info(input, env = env)["datatype"]
+    params = {}
+    if overviews:
+        params["overviews"] = overviews
+    grass.run_command("r.out.gdal", input = input, output = output, format = "GTiff",
+        type = gdal_type(input, env = env), createopt = geotiff_options(datatype, **kwargs),
+        overwrite = True, quiet = True, env = env, **params)
+    return output
+
+# function to export several maps concurrently, as output_dir/map.tif
+# r.out.gdal runs as separate processes, so threads are enough to keep nprocs cores busy;
+# all maps are exported in the same region, which must not change while they run
+def export_maps(maps = [], output_dir = "", nprocs = 4, **kwargs):
+
+    def export(i):
+        output = export_map(i, os.path.join(output_dir, i.split("@")[0]+".tif"), **kwargs)
+        print("exported: " + output)
+        return output
+
+    with ThreadPoolExecutor(max_workers = nprocs) as executor:
+        return list(executor.map(export, maps))
+
+# function to build a virtual raster (VRT) with one band per file, with gdalbuildvrt
+# the files must have the same extent and resolution; each band is described by the
+# name of its file, so it keeps the map name when read in R (e.g. terra::rast)
+def build_vrt(files = [], output = ""):
+
+    subprocess.run(["gdalbuildvrt", "-overwrite", "-separate", output] + list(files), check = True)
+
+    tree = ET.parse(output)
+    for band, i in zip(tree.getroot().iter("VRTRasterBand"), files):
+        description = ET.Element("Description")
+        description.text = os.path.splitext(os.path.basename(i))[0]
+        band.insert(0, description)
+    tree.write(output)
+
+    return output
+
+# function to export several maps as a single multiband GeoTIFF, through an imagery group
+# all bands are written with the same type, the smallest type holding the values of all maps
+# a group with the same name left by a previous run is replaced, so that it has only these maps
+def export_multiband(maps = [], output = "", group = "export_group", **kwargs):
+
+    datatypes = [grass.raster_info(i)["datatype"] for i in maps]
+    datatype = max(datatypes, key = list(export_types).index)
+    mapset = grass.gisenv()["MAPSET"]
+    if grass.find_file(group, element = "group", mapset = mapset)["file"]:
+        grass.run_command("g.remove", type = "group", name = group, flags = "f", quiet = True)
+    try:
+        grass.run_command("i.group", group = group, input = maps, quiet = True)
+        grass.run_command("r.out.gdal", input = group, output = output, format = "GTiff",
+            type = gdal_type(maps), createopt = geotiff_options(datatype, **kwargs),
+            overwrite = True, quiet = True)
+    finally:
+        grass.run_command("g.remove", type = "group", name = group, flags = "f", quiet = True)
+
+    return output
@@ -0,0 +1,85 @@
+import os
+from itertools import islice
+from pathlib import Path
+import numpy as np
+import grass.script as grass
+from grass.script import array as garray
+from grass.pygrass.modules.shortcuts import general as g
+
+from convert_decimal_comma import convert_decimal_comma_files
+
+# function to read the points of a XYZ text file in chunks of lines
+# returns the x, y, z arrays
+def read_xyz(input = "", separator = ";", skip = 1, chunk_lines = 10**6):
+
+    x, y, z = [], [], []
+    with open(input, "r") as f:
+        # header
+        for i in range(skip):
+            f.readline()
+        while True:
+            lines = list(islice(f, chunk_lines))
+            if not lines:
+                break
+            chunk = np.loadtxt(lines, delimiter = separator, usecols = (0, 1, 2), ndmin = 2)
+            x.append(chunk[:, 0])
+            y.append(chunk[:, 1])
+            z.append(chunk[:, 2])
+
+    return np.concatenate(x), np.concatenate(y), np.concatenate(z)
+
+# function to import a XYZ text file with points at the center of the cells of a regular grid
+# the file is read only once: the bounds are computed from the points, the region is
+# set with the bounds padded by res/2, and the mean z per cell is written to the output map
+def import_xyz(input = "", output = "", res = 50.0, separator = ";", skip = 1, overwrite = True):
+
+    x, y, z = read_xyz(input, separator = separator, skip = skip)
+
+    # region from the point bounds, padded by half a cell
+    n = y.max() + res/2
+    s = y.min() - res/2
+    e = x.max() + res/2
+    w = x.min() - res/2
+    g.region(n = n, s = s, w = w, e = e, res = res, flags = "p")
+    region = grass.region()
+    rows, cols = region["rows"], region["cols"]
+
+    # cell of each point
+    row = np.clip(((region["n"] - y) / region["nsres"]).astype(np.int64), 0, rows - 1)
+    col = np.clip(((x - region["w"]) / region["ewres"]).astype(np.int64), 0, cols - 1)
+    cell = row * cols + col
+
+    # mean value per cell, as r.in.xyz method=mean
+    total = np.bincount(cell, weights = z, minlength = rows * cols)
+    count = np.bincount(cell, minlength = rows * cols)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+
+    # write
+    out = garray.array(dtype = np.float32)
+    out[...] = mean.reshape(rows, cols)
+    out.write(output, null = np.nan, overwrite = overwrite)
+
+    return output
+
+# function to import all XYZ files in a folder (e.g. the sound models of a study area)
+# the output names are the file names with replace substituted by prefix
+# if convert_decimal is True, the files are first converted to use dots as decimal separator
+def import_xyz_dir(directory = "", prefix = "", replace = "RRLK00", pattern = "*.TXT",
+    res = 50.0, separator = ";", skip = 1, convert_decimal = True, nprocs = 4, overwrite = True):
+
+    files = sorted(str(path) for path in Path(directory).rglob(pattern))
+    if convert_decimal:
+        inputs = convert_decimal_comma_files(files, separator = separator, nprocs = nprocs)
+    else:
+        inputs = files
+
+    names = []
+    for i, file_xyz in zip(files, inputs):
+        name = os.path.splitext(os.path.basename(i))[0].replace(replace, prefix)
+        print(name)
+        import_xyz(input = file_xyz, output = name, res = res, separator = separator,
+            skip = skip, overwrite = overwrite)
+        names.append(name)
+
+    return names
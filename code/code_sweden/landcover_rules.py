@@ -0,0 +1,33 @@
+# function to define the rules to harmonize the NMD land cover (reclassified) with
+# SMD and other maps. Each rule is (condition, new class), applied in order;
+# {x} in the condition is the class resulting from the previous rules
+def nmd_smd_rules(smd = "", urban = "", agriculture = []):
+
+    return [
+        # replace tundra from NMD (41) by rocks/tundra from SMD (59)
+        ("{x} == 41 && "+smd+" == 59", 201),
+        # replace other open land from NMD (42) by heath from SMD (52)
+        ("{x} == 42 && "+smd+" == 52", 202),
+        # clasify ski slopes (17) and urban areas as anthropogenic
+        ("!isnull("+urban+") || "+smd+" == 17", 51),
+        # merge what remains as 41 and 42 as 41 = other open lands
+        ("{x} == 42", 41),
+        # in other open lands (41), if there is agriculture SMD or JBM, consider as arable lands (3)
+        ("{x} == 41 && ("+" || ".join("!isnull("+i+")" for i in agriculture)+")", 3)]
+
+# function to compile a list of rules into a single r.mapcalc expression
+# the rules are chained within eval(), so all rules are applied in one pass over the maps,
+# with the same result (including nulls) as applying each rule in a separate r.mapcalc call
+def landcover_expression(output = "", input = "", rules = []):
+
+    steps = []
+    x = input
+    for i, (condition, value) in enumerate(rules):
+        step = "lc_rule"+str(i+1)
+        steps.append(step+" = if("+condition.format(x = x)+", "+str(value)+", "+x+")")
+        x = step
+
+    if not steps:
+        return output+" = "+input
+
+    return output+" = eval("+", ".join(steps)+", "+x+")"
@@ -0,0 +1,134 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import grass.script as grass
+
+# function to create a temporary mapset in the current location
+# returns the mapset name and an environment in which GRASS modules run in that mapset,
+# with its own region (WIND) and MASK, without touching the current session
+def temporary_mapset(prefix = "tmp_job_"):
+
+    gisenv = grass.gisenv()
+    location_dir = os.path.join(gisenv["GISDBASE"], gisenv["LOCATION_NAME"])
+
+    # create the mapset folder with the default region of the location
+    name = prefix + uuid.uuid4().hex[:12]
+    os.makedirs(os.path.join(location_dir, name))
+    shutil.copy(os.path.join(location_dir, "PERMANENT", "DEFAULT_WIND"),
+        os.path.join(location_dir, name, "WIND"))
+
+    # separate GISRC file pointing to the new mapset
+    fd, gisrc = tempfile.mkstemp(prefix = "gisrc_")
+    with os.fdopen(fd, "w") as f:
+        f.write("GISDBASE: " + gisenv["GISDBASE"] + "\n")
+        f.write("LOCATION_NAME: " + gisenv["LOCATION_NAME"] + "\n")
+        f.write("MAPSET: " + name + "\n")
+        f.write("GUI: text\n")
+
+    env = os.environ.copy()
+    env["GISRC"] = gisrc
+    # the region is defined within the temporary mapset
+    env.pop("GRASS_REGION", None)
+    env.pop("WIND_OVERRIDE", None)
+
+    # same mapset search path as the current mapset, so that inputs are found
+    search_path = grass.read_command("g.mapsets", flags = "p", separator = "comma").strip()
+    grass.run_command("g.mapsets", mapset = search_path, operation = "set", env = env, quiet = True)
+
+    return name, env
+
+# function to remove a temporary mapset and its GISRC file
+def remove_temporary_mapset(name, env):
+
+    gisenv = grass.gisenv()
+    shutil.rmtree(os.path.join(gisenv["GISDBASE"], gisenv["LOCATION_NAME"], name),
+        ignore_errors = True)
+    os.remove(env["GISRC"])
+
+# function to run one job in a temporary mapset (or in the current mapset, see in_place)
+# a job is a dictionary with
+#   region: parameters for g.region (optional)
+#   mask: parameters for r.mask (optional)
+#   steps: list of (module, parameters) run in order
+#   outputs: list of raster maps to be copied to the target mapset
+#   type: "raster" (default) or "vector", the type of the outputs
+#   in_place: if True, the steps are run directly in the current mapset, with the region
+#             given to the modules (GRASS_REGION), and nothing is copied; for modules
+#             that write each map only once and do not need a MASK (the MASK of the
+#             current mapset applies)
+# the time taken by the job is stored in job["time"]
+def run_job(job):
+
+    start = time.perf_counter()
+    if job.get("in_place"):
+        env = os.environ.copy()
+        if job.get("region"):
+            env["GRASS_REGION"] = grass.region_env(**job["region"])
+        for module, params in job["steps"]:
+            grass.run_command(module, env = env, **params)
+        job["time"] = time.perf_counter() - start
+        return None, env
+
+    name, env = temporary_mapset()
+    try:
+        if job.get("region"):
+            grass.run_command("g.region", env = env, quiet = True, **job["region"])
+        if job.get("mask"):
+            grass.run_command("r.mask", env = env, quiet = True, **job["mask"])
+        for module, params in job["steps"]:
+            grass.run_command(module, env = env, **params)
+    except Exception:
+        remove_temporary_mapset(name, env)
+        raise
+    job["time"] = time.perf_counter() - start
+
+    return name, env
+
+# function to copy the outputs of a job from its temporary mapset to the current mapset
+# the time taken by the copy is stored in job["merge_time"]
+# jobs run in place have nothing to copy
+def merge_job(job, name, env):
+
+    if name is None:
+        job["merge_time"] = 0.0
+        return
+    start = time.perf_counter()
+    element = job.get("type", "raster")
+    try:
+        for i in job["outputs"]:
+            grass.run_command("g.copy", overwrite = True, quiet = True,
+                **{element: i+"@"+name+","+i})
+    finally:
+        remove_temporary_mapset(name, env)
+    job["merge_time"] = time.perf_counter() - start
+
+# function to run independent jobs concurrently and merge their outputs into the current mapset
+# GRASS modules run as separate processes, so threads are enough to keep nprocs cores busy
+# on_merged (optional) is called with each job after its outputs are merged
+def run_parallel(jobs, nprocs = 4, on_merged = None):
+
+    merged = []
+    errors = []
+    with ThreadPoolExecutor(max_workers = nprocs) as executor:
+        futures = {executor.submit(run_job, job): job for job in jobs}
+        # outputs are merged one at a time, as jobs finish
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                name, env = future.result()
+            except Exception as e:
+                errors.append((job["outputs"], e))
+                continue
+            merge_job(job, name, env)
+            merged += job["outputs"]
+            if on_merged is not None:
+                on_merged(job)
+            print("done: " + ", ".join(job["outputs"]))
+
+    if errors:
+        raise RuntimeError("Jobs failed: " + "; ".join(", ".join(o)+" ("+str(e)+")" for o, e in errors))
+
+    return merged
@@ -0,0 +1,238 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import grass.script as grass
+
+from tiles import window_region, patch_maps
+from temp_maps import temporary_maps
+
+# numpy type, bytes and r.in.bin flags for each type of GRASS raster map
+raster_types = {"CELL": (np.int32, 4, "s"), "FCELL": (np.float32, 4, "f"), "DCELL": (np.float64, 8, "d")}
+
+# null value of CELL maps
+cell_null = np.iinfo(np.int32).min
+
+# numpy type used to read each type of GRASS raster map, with nulls as NaN
+# CELL maps are read as float64, which holds all 32-bit integers exactly
+def read_type(mapname = "", env = None):
+
+    datatype = grass.raster_info(mapname, env = env)["datatype"]
+    return np.float32 if datatype == "FCELL" else np.float64
+
+# function to export a raster map with r.out.bin to a temporary file, in the current
+# region (or the region defined in env), with nulls as NaN
+def export_binary(mapname = "", dtype = np.float64, env = None):
+
+    filename = grass.tempfile()
+    grass.run_command("r.out.bin", input = mapname, output = filename, flags = "f",
+        bytes = np.dtype(dtype).itemsize, null = "nan", overwrite = True, quiet = True, env = env)
+    return filename
+
+# function to import a binary file with r.in.bin, in the current region (or the region
+# defined in env); NaN (float types) or the CELL null value (CELL) are imported as null
+def import_binary(filename = "", mapname = "", output_type = "FCELL", env = None, overwrite = True):
+
+    region = grass.region(env = env)
+    dtype, size, flags = raster_types[output_type]
+
+    params = {}
+    if output_type == "CELL":
+        params["anull"] = cell_null
+    grass.run_command("r.in.bin", input = filename, output = mapname, flags = flags,
+        bytes = size, north = region["n"], south = region["s"], east = region["e"], west = region["w"],
+        rows = region["rows"], cols = region["cols"], overwrite = overwrite, quiet = True, env = env,
+        **params)
+
+# function to read a raster map into a memory-mapped array, with nulls as NaN
+# the map is exported once with r.out.bin to a temporary file, in the current region
+# (or the region defined in env), and the file is mapped into memory
+# FCELL maps are read as float32, CELL and DCELL maps as float64
+def read_map(mapname = "", env = None):
+
+    region = grass.region(env = env)
+    dtype = read_type(mapname, env = env)
+    filename = export_binary(mapname, dtype, env = env)
+
+    return np.memmap(filename, dtype = dtype, mode = "r", shape = (region["rows"], region["cols"]))
+
+# function to create an empty memory-mapped array for an output map
+def empty_map(output_type = "FCELL", env = None):
+
+    region = grass.region(env = env)
+    dtype = raster_types[output_type][0]
+
+    return np.memmap(grass.tempfile(), dtype = dtype, mode = "w+", shape = (region["rows"], region["cols"]))
+
+# function to write a memory-mapped array to a raster map with r.in.bin
+# NaN (float types) or the CELL null value (CELL) are written as null
+def write_map(array, mapname = "", output_type = "FCELL", env = None, overwrite = True):
+
+    array.flush()
+    import_binary(array.filename, mapname, output_type, env = env, overwrite = overwrite)
+
+# function to remove the files behind memory-mapped arrays
+# the arrays must not be referenced anymore (the files cannot be removed while mapped on Windows)
+def remove_files(filenames = []):
+
+    for i in filenames:
+        if os.path.exists(i):
+            os.remove(i)
+
+# function to split the rows of the region in blocks
+def row_blocks(rows, block_rows = 1024):
+
+    return [(i, min(i + block_rows, rows)) for i in range(0, rows, block_rows)]
+
+# function to get an environment where the modules use the rows r0:r1 of a region
+# (a dictionary from grass.region) as their region
+def block_env(region, r0 = 0, r1 = 0, env = None):
+
+    env = dict(env or os.environ)
+    env["GRASS_REGION"] = grass.region_env(**window_region(region, r0, r1, 0, region["cols"]))
+    return env
+
+# function to read the rows of a block of a raster map into an array, with nulls as NaN
+# env defines the region of the block (see block_env)
+def read_block(mapname = "", rows = 0, dtype = np.float64, env = None):
+
+    filename = export_binary(mapname, dtype, env = env)
+    try:
+        return np.fromfile(filename, dtype = dtype).reshape(rows, -1)
+    finally:
+        os.remove(filename)
+
+# function to write an array to the map of a block, in the region defined in env
+# (see block_env)
+def write_block(array, mapname = "", output_type = "FCELL", env = None):
+
+    dtype = raster_types[output_type][0]
+    if output_type == "CELL":
+        array = np.where(np.isnan(array), cell_null, array)
+    filename = grass.tempfile()
+    try:
+        np.asarray(array, dtype = dtype).tofile(filename)
+        import_binary(filename, mapname, output_type, env = env)
+    finally:
+        os.remove(filename)
+
+# function to evaluate a per-pixel function over raster maps, by blocks of rows
+#   function: numpy function taking one array per input (as keyword arguments) and
+#             returning one array (or a tuple of arrays, one per output)
+#   inputs: dictionary {argument name: map name}
+#   outputs: name of the output map, or list of names
+#   output_type: "CELL", "FCELL" or "DCELL", or a list with one type per output
+#   overlap: number of rows added above and below each block, for functions that use
+#            neighboring cells; the function returns arrays for the block with the overlap
+# each block is read with r.out.bin and written with r.in.bin in the region of its rows,
+# so only the blocks being processed are in memory or on disk; blocks are processed in
+# parallel by nthreads threads, and the maps of the blocks are then patched into the outputs
+def map_blocks(function, inputs = {}, outputs = [], output_type = "FCELL", block_rows = 1024,
+    overlap = 0, nthreads = 4, overwrite = True, env = None):
+
+    if isinstance(outputs, str):
+        outputs = [outputs]
+    if isinstance(output_type, str):
+        output_type = [output_type] * len(outputs)
+
+    region = grass.region(env = env)
+    rows = region["rows"]
+    dtypes = {i: read_type(inputs[i], env = env) for i in inputs}
+
+    with temporary_maps() as tmp, ThreadPoolExecutor(max_workers = nthreads) as executor:
+
+        # process blocks
+        def process(block):
+            r0, r1 = block
+            # rows read, with the overlap
+            a0, a1 = max(r0 - overlap, 0), min(r1 + overlap, rows)
+            read_env = block_env(region, a0, a1, env)
+            res = function(**{i: read_block(inputs[i], a1 - a0, dtypes[i], read_env) for i in inputs})
+            if not isinstance(res, tuple):
+                res = (res, )
+            write_env = block_env(region, r0, r1, env)
+            names = []
+            for typ, values in zip(output_type, res):
+                names.append(tmp("block"))
+                write_block(values[(r0 - a0):(r1 - a0)], names[-1], typ, write_env)
+            return names
+
+        blocks = list(executor.map(process, row_blocks(rows, block_rows)))
+
+        # write outputs
+        list(executor.map(lambda i: patch_maps([names[i] for names in blocks], outputs[i],
+            overwrite = overwrite, env = env), range(len(outputs))))
+
+    return outputs
+
+# function to compare the time of map_blocks with the time of the same step in r.mapcalc
+# the r.mapcalc output is named output+"_mapcalc"
+def benchmark_blocks(expression = "", function = None, inputs = {}, output = "", **kwargs):
+
+    start = time.perf_counter()
+    grass.mapcalc(output+"_mapcalc = "+expression, overwrite = True, quiet = True)
+    time_mapcalc = time.perf_counter() - start
+
+    start = time.perf_counter()
+    map_blocks(function, inputs = inputs, outputs = output, **kwargs)
+    time_blocks = time.perf_counter() - start
+
+    print(output + ": r.mapcalc " + str(round(time_mapcalc, 2)) + " s, numpy blocks " +
+        str(round(time_blocks, 2)) + " s")
+
+    return {"mapcalc": time_mapcalc, "blocks": time_blocks}
+
+#---------------------------------------
+# per-pixel functions, equivalent to the r.mapcalc expressions used in the scripts
+# nulls (NaN) propagate as in r.mapcalc
+
+# clear cuts between two years replace the land cover class
+# if((clear_cuts < year_max && clear_cuts > year_min), value, landcover)
+def clear_cut_update(clear_cuts, landcover, year_min = 2000, year_max = 2008, value = 54):
+
+    out = np.where((clear_cuts < year_max) & (clear_cuts > year_min), value, landcover)
+    return np.where(np.isnan(clear_cuts), np.nan, out)
+
+# keep values only where there are no roads
+# if(isnull(road1) && isnull(road2) ..., input, null())
+def mask_roads(input, **roads):
+
+    keep = np.ones(input.shape, dtype = bool)
+    for i in roads.values():
+        keep &= np.isnan(i)
+    return np.where(keep, input, np.nan)
+
+# aspect (counterclockwise from east) in 4 directions: 1 = N, 2 = E, 3 = S, 4 = W
+def aspect_nesw(aspect):
+
+    compass = np.fmod(450.0 - aspect, 360.0)
+    out = np.select([compass < 45.0, compass < 135.0, compass < 225.0, compass < 315.0],
+        [1, 2, 3, 4], 1).astype(np.float32)
+    return np.where(np.isnan(aspect), np.nan, out)
+
+# difference between a map and its neighborhood average (TPI)
+def difference(input, average):
+
+    return input - average
+
+# summed-area table (integral image) of an array, with a row and a column of zeros
+# at the beginning; NaN are summed as 0
+def summed_area_table(array):
+
+    sat = np.zeros((array.shape[0] + 1, array.shape[1] + 1), dtype = np.float64)
+    np.cumsum(np.cumsum(np.nan_to_num(array, nan = 0.0), axis = 0, dtype = np.float64),
+        axis = 1, out = sat[1:, 1:])
+    return sat
+
+# sum of the cells within a square window of size x size cells centered on each cell,
+# from a summed-area table; the window is cut at the borders of the array
+def window_sum(sat, size = 3):
+
+    rows, cols = sat.shape[0] - 1, sat.shape[1] - 1
+    half = size // 2
+    i0 = np.clip(np.arange(rows) - half, 0, rows)
+    i1 = np.clip(np.arange(rows) + half + 1, 0, rows)
+    j0 = np.clip(np.arange(cols) - half, 0, cols)
+    j1 = np.clip(np.arange(cols) + half + 1, 0, cols)
+
+    return sat[np.ix_(i1, j1)] - sat[np.ix_(i0, j1)] - sat[np.ix_(i1, j0)] + sat[np.ix_(i0, j0)]
@@ -0,0 +1,94 @@
+import grass.script as grass
+from grass.pygrass.modules.shortcuts import general as g
+from grass.pygrass.modules.shortcuts import vector as v
+
+# function to get the categories of the features of a vector map, optionally filtered
+# by a where clause
+def vector_cats(input = "", where = None, layer = 1):
+
+    params = {"where": where} if where else {}
+    out = grass.read_command("v.db.select", map = input, layer = layer, columns = "cat",
+        flags = "c", **params)
+    return [i.strip() for i in out.splitlines() if i.strip()]
+
+# function to get the groups of features defined by the values of a column
+# returns a dictionary {value: list of categories}
+def column_groups(input = "", column = "", layer = 1):
+
+    out = grass.read_command("v.db.select", map = input, layer = layer,
+        columns = "cat,"+column, separator = "pipe", flags = "c")
+    groups = {}
+    for line in out.splitlines():
+        if not line.strip():
+            continue
+        cat, value = line.split("|", 1)
+        groups.setdefault(value, []).append(cat)
+    return groups
+
+# function to get the rules of r.reclass giving a value to the categories cats, and null
+# to all others; cats None gives the value to all categories, and no cats gives null to all
+# r.reclass reads the rules line by line, so there is one rule per line, and consecutive
+# categories are collapsed in ranges (a thru b)
+def reclass_rules(cats = None, value = 1):
+
+    if cats is None:
+        return "* = " + str(value) + "\n"
+
+    rules = []
+    cats = sorted(set(int(i) for i in cats))
+    start = 0
+    for i in range(1, len(cats) + 1):
+        if i == len(cats) or cats[i] != cats[i - 1] + 1:
+            if start == i - 1:
+                rules.append(str(cats[start]) + " = " + str(value))
+            else:
+                rules.append(str(cats[start]) + " thru " + str(cats[i - 1]) + " = " + str(value))
+            start = i
+    rules.append("* = NULL")
+    return "\n".join(rules) + "\n"
+
+# function to write a reclassified map with value 1 for the given categories of a base map
+# (all categories, if cats is None)
+# r.reclass writes only the rules, the cells are read from the base map
+def reclass_cats(base = "", output = "", cats = None, value = 1, overwrite = True):
+
+    grass.write_command("r.reclass", input = base, output = output, rules = "-",
+        stdin = reclass_rules(cats, value), overwrite = overwrite, quiet = True)
+
+# function to rasterize many subsets of a vector map reading the vector only once
+# the vector is rasterized once with its categories (base map, kept since the outputs
+# refer to it), and each output is a reclassification of the categories selected by
+#   groups: dictionary {output map: where clause}; a where clause None selects all features
+#   column: alternatively, one output per value of a column, named prefix+value
+# the region is set from the vector, aligned to map_to_align
+# cells with several features keep the category of only one of them, so features of
+# different groups should not share cells
+def rasterize_groups(input = "", base = None, groups = {}, column = None, prefix = "",
+    map_to_align = "", value = 1, overwrite = True, **kwargs):
+
+    if base is None:
+        base = input.split("@")[0] + "_cat"
+
+    # region
+    g.region(vector = input, align = map_to_align, flags = "ap")
+
+    # rasterize once, with the categories
+    v.to_rast(input = input, output = base, use = "cat", overwrite = overwrite, **kwargs)
+
+    # categories of each output
+    if column is not None:
+        selected = {prefix + str(val): cats for val, cats in column_groups(input, column).items()}
+    else:
+        selected = {output: None if where is None else vector_cats(input, where)
+            for output, where in groups.items()}
+
+    # groups without features are written as well, with null everywhere, so that
+    # no map of a previous run is left and the outputs always exist
+    outputs = []
+    for output, cats in selected.items():
+        if cats is not None and not cats:
+            print("no features selected for " + output + ", the map is null")
+        reclass_cats(base, output, cats, value = value, overwrite = overwrite)
+        outputs.append(output)
+
+    return outputs
@@ -14,6 +14,16 @@ from grass.pygrass.modules.shortcuts import general as g
 from grass.pygrass.modules.shortcuts import vector as v
 from grass.pygrass.modules.shortcuts import raster as r
 
+# code folder
+code_dir = r"D:\bernardo\00_academico\07_projetos\05_reindeer\05_env_data\00_grassdb\code"
+os.chdir(code_dir)
+
+# import functions
+from calculate_tpi import calculate_tpi_multiscale
+from bulk_import import source, bulk_import
+from export_maps import export_maps
+from tiles import run_tiled, fill_holes
+
 # make sure extensions used are installed
 #g.extension(extension = "r.tri")
 
@@ -54,8 +64,11 @@ r.out_gdal(input = "MullDEM_10m_resamp", output = dem2m_dir + "/MullDEM_2m_resam
 #---------------------------------------
 # Resampling DEM for whole Sweden
 
-# Import DEM_2m for Mullberg
-r.in_gdal(input = dem2m_dir + "/hojddata2.tif", output = "dem_2m_Sweden_hojddata2")
+# Link DEM_2m for Sweden
+# the file is not copied into the GRASS database: a tiled copy (cloud optimized GeoTIFF)
+# is linked with r.external, so that the reads by window are fast
+bulk_import([source(dem2m_dir + "/hojddata2.tif", "dem_2m_Sweden_hojddata2", module = "r.in.gdal", 
+    external = True, tiled = "cog")])
 
 # Import reindeer husbandry area, with 50km bugffer
 mask_dir = r"data/sam_reindeer_ancillary/"
@@ -68,8 +81,11 @@ g.region(vector = "sameby_limits_buff_50km", res = 10, flags = "ap")
 r.mask(vector = "sameby_limits_buff_50km")
 
 # resample dem from 2m to 10m: weighted resampling -w
-r.resamp_stats(input = "dem_2m_Sweden_hojddata2", output = "dem_10m_Sweden_resampled_hojddata2", flags = "w", 
-    overwrite = True)
+# the region is split in tiles aligned to the 10m cells, resampled in parallel and patched;
+# if the run is interrupted, running it again only computes the missing tiles
+run_tiled("r.resamp.stats", output = "dem_10m_Sweden_resampled_hojddata2", 
+    params = dict(input = "dem_2m_Sweden_hojddata2", flags = "w"), 
+    tile_size = 4000, nprocs = 8, mask = "MASK@"+mapset_name)
 
 # there are some holes in the data
 # load dem 50m to fill these holes
@@ -80,9 +96,10 @@ r.in_gdal(input = dem50m_dir + "/dem50m.tif", output = "dem50m")
 # fill holes
 g.region(vector = "sameby_limits_buff_50km", res = 10, flags = "ap")
 
-dem_maps = ("dem_10m_Sweden_resampled_hojddata2", "dem_2m_resamp_10m_Sweden_pt1",
-    "dem_2m_resamp_10m_Sweden_pt2", "dem50m")
-r.patch(input = dem_maps, output = "dem_10m_Sweden")
+# only the tiles with holes in the resampled DEM are patched with the other maps
+dem_fill = ("dem_2m_resamp_10m_Sweden_pt1", "dem_2m_resamp_10m_Sweden_pt2", "dem50m")
+fill_holes(input = "dem_10m_Sweden_resampled_hojddata2", fallbacks = dem_fill, 
+    output = "dem_10m_Sweden", tile_size = 4000, nprocs = 8, mask = "MASK@"+mapset_name)
 
 # create slope, aspect, and tri from dem
 
@@ -97,26 +114,16 @@ r.slope_aspect(elevation = "dem_10m_Sweden", slope = "slope_10m_Sweden", aspect
 # r.tri(input = i, output = i+"tri", size = 3, flags = "c", overwrite = True)
 
 # TPI
+# all scales computed in one pass, with circular windows (as r.neighbors -c)
 dem_map = "dem_10m_Sweden"
-radius_m = 150
 pixel_size = 10
-size = int(2*radius_m/10 + 1)
-tpi_map = dem_map.replace("dem", "tpi_s"+str(radius_m)+"m")
-calculate_tpi(input = dem_map, output = tpi_map, size = size, flags = "c")
+sizes = {}
+for radius_m in [150, 250, 510]:
+    size = int(2*radius_m/pixel_size + 1)
+    tpi_map = dem_map.replace("dem", "tpi_s"+str(radius_m)+"m")
+    sizes[tpi_map] = size
 
-dem_map = "dem_10m_Sweden"
-radius_m = 250
-pixel_size = 10
-size = int(2*radius_m/10 + 1)
-tpi_map = dem_map.replace("dem", "tpi_s"+str(radius_m)+"m")
-calculate_tpi(input = dem_map, output = tpi_map, size = size, flags = "c")
-
-dem_map = "dem_10m_Sweden"
-radius_m = 510
-pixel_size = 10
-size = int(2*radius_m/10 + 1)
-tpi_map = dem_map.replace("dem", "tpi_s"+str(radius_m)+"m")
-calculate_tpi(input = dem_map, output = tpi_map, size = size, flags = "c")
+calculate_tpi_multiscale(input = dem_map, sizes = sizes)
 
 # export maps
 
@@ -131,10 +138,6 @@ maps = grass.list_grouped(type = "raster", pattern = "*10m_Sweden")["location_de
 g.region(raster = "dem_10m_Sweden", flags = "ap")
 
 # export
-for i in maps:
-    #export
-    r.out_gdal(input = i, output = i+".tif", overwrite = True,
-        createopt = "BIGTIFF=YES")
-    # export compressed
-    r.out_gdal(input = i, output = i+"_compressed.tif", overwrite = True,
-        createopt = "COMPRESS=DEFLATE,TFW=YES,BIGTIFF=YES")
\ No newline at end of file
+# each map is written once, as a tiled and compressed GeoTIFF with overviews,
+# with several maps exported at the same time
+export_maps(maps, output_dir = outdir, nprocs = 4)
\ No newline at end of file
@@ -0,0 +1,37 @@
+import os
+import uuid
+from contextlib import contextmanager
+import grass.script as grass
+
+# element used to check if a map of each type exists
+elements = {"raster": "cellhd", "vector": "vector"}
+
+# function to get a unique name for a temporary map
+# the process id and a random suffix make names unique also across parallel runs
+def temporary_name(prefix = "tmp"):
+
+    return prefix + "_" + str(os.getpid()) + "_" + uuid.uuid4().hex[:8]
+
+# context manager that gives a function to create unique names for temporary maps
+# all maps created with these names in the current mapset are removed at the end,
+# also if an error occurs
+#   with temporary_maps() as tmp:
+#       avg = tmp("dem_avg")
+#       r.neighbors(input = dem, output = avg, ...)
+@contextmanager
+def temporary_maps(type = "raster"):
+
+    names = []
+
+    def new_name(prefix = "tmp"):
+        name = temporary_name(prefix)
+        names.append(name)
+        return name
+
+    try:
+        yield new_name
+    finally:
+        mapset = grass.gisenv()["MAPSET"]
+        existing = [i for i in names if grass.find_file(i, element = elements[type], mapset = mapset)["file"]]
+        if existing:
+            grass.run_command("g.remove", type = type, name = existing, flags = "f", quiet = True)
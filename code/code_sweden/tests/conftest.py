@@ -0,0 +1,47 @@
+import os
+import sys
+import shutil
+import subprocess
+import pytest
+
+# the scripts import the functions from the code folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# function to get the folder of the GRASS python package, or None if GRASS is not installed
+def grass_python_path():
+
+    executable = shutil.which("grass")
+    if executable is None:
+        return None
+    out = subprocess.run([executable, "--config", "python_path"], capture_output = True,
+        text = True, check = True)
+    return out.stdout.strip()
+
+# GRASS python package, for the tests of modules that import it but do not need a session
+# the tests using it are skipped if GRASS is not installed
+@pytest.fixture
+def grass_python():
+
+    path = grass_python_path()
+    if path is None:
+        pytest.skip("GRASS GIS is not installed")
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+    import grass.script as grass
+    return grass
+
+# GRASS session in a new location (EPSG:3006, SWEREF99 TM), in a temporary folder
+# the tests using it are skipped if GRASS is not installed
+@pytest.fixture
+def grass_session(tmp_path, grass_python):
+
+    grass = grass_python
+    import grass.script.setup as gsetup
+
+    grass.create_location(str(tmp_path), "test", epsg = "3006")
+    gsetup.init(str(tmp_path), "test", "PERMANENT")
+    try:
+        yield grass
+    finally:
+        gsetup.finish()
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+# distance from each cell to the nearest source cell, computed from all pairs of cells
+def brute_force_distance(source, nsres, ewres):
+
+    rows, cols = np.indices(source.shape)
+    si, sj = np.nonzero(source)
+    if len(si) == 0:
+        return np.full(source.shape, np.nan)
+    d = np.sqrt(((rows[..., None] - si) * nsres)**2 + ((cols[..., None] - sj) * ewres)**2)
+    return d.min(axis = -1)
+
+# the exact distance transform must give the same distances as the brute force, also
+# with different resolutions along rows and columns and with several blocks and threads
+@pytest.mark.parametrize("density", [0.001, 0.02, 0.3])
+@pytest.mark.parametrize("nsres, ewres", [(1.0, 1.0), (10.0, 10.0), (25.0, 10.0)])
+def test_distance_transform_matches_brute_force(grass_python, density, nsres, ewres):
+
+    from distance_transform import distance_transform
+
+    rng = np.random.default_rng(42)
+    source = rng.random((53, 71)) < density
+    source[rng.integers(53), rng.integers(71)] = True
+    array = np.where(source, 1.0, np.nan)
+
+    result = distance_transform(array, nsres = nsres, ewres = ewres, block_size = 16, nthreads = 3)
+
+    np.testing.assert_allclose(result, brute_force_distance(source, nsres, ewres), rtol = 1e-6)
+
+# without sources all distances are null
+def test_distance_transform_no_sources(grass_python):
+
+    from distance_transform import distance_transform
+
+    result = distance_transform(np.full((10, 12), np.nan))
+
+    assert np.isnan(result).all()
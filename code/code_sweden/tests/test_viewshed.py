@@ -0,0 +1,43 @@
+# the viewsheds of a study area are computed twice, with the maps of the study area
+# cut again in between, as cut_maps does; the second run must take all turbine
+# viewsheds from the cache and give the same count maps
+def test_make_viewsheds_second_run_computes_nothing(grass_session, tmp_path, monkeypatch):
+
+    grass = grass_session
+    import viewshed
+    from cut_maps import layer, set_study_area, cut_layers, make_viewsheds
+
+    # DEM, turbines of two parks and study area
+    grass.run_command("g.region", n = 7002000, s = 7000000, w = 600000, e = 602000, res = 10)
+    grass.mapcalc("dem_national = 300 + 0.1 * row() + 0.2 * col()")
+    grass.write_command("v.in.ascii", input = "-", output = "turbines", separator = "pipe",
+        columns = "x double precision, y double precision, cat integer, Omrades_ID varchar(20)",
+        x = 1, y = 2, cat = 3, stdin = "600500|7000500|1|A\n601500|7001500|2|A\n601000|7000200|3|B\n")
+    grass.run_command("v.in.region", output = "availability")
+
+    area = {"mapset": "availability_test", "availability_vector": "availability@PERMANENT",
+        "layers": [layer("dem_national", "PERMANENT", "dem_10m")]}
+    area["viewshed"] = {"dem": "dem_national@PERMANENT", "turbines": "turbines@PERMANENT",
+        "reindeer_height": 1.1, "cache_dir": str(tmp_path / "viewshed_cache"),
+        "parks": [{"output": "viewshed_a", "code": "A", "height": 100.0},
+            {"output": "viewshed_b", "code": "B", "height": 100.0}],
+        "combined": "viewshed_binary"}
+
+    # number of turbine viewsheds computed in each run
+    computed = []
+    run_parallel = viewshed.run_parallel
+    def recording_run_parallel(jobs, **kwargs):
+        computed.append(len(jobs))
+        return run_parallel(jobs, **kwargs)
+    monkeypatch.setattr(viewshed, "run_parallel", recording_run_parallel)
+
+    sums = []
+    for i in range(2):
+        set_study_area(area, map_to_align = "dem_national@PERMANENT")
+        cut_layers(area)
+        make_viewsheds(area, nprocs = 2)
+        sums.append([grass.parse_command("r.univar", map = park["output"], flags = "g")["sum"]
+            for park in area["viewshed"]["parks"]])
+
+    assert computed == [3, 0]
+    assert sums[0] == sums[1]
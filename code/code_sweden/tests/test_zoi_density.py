@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+kernels = ["rectangle", "circle", "gaussian", "exp_decay"]
+
+# an array with isolated features, clusters, nulls and features on the borders
+def features(rows = 60, cols = 45, seed = 1):
+
+    rng = np.random.default_rng(seed)
+    array = (rng.random((rows, cols)) < 0.05).astype(float)
+    array[20:25, 10:18] = 1
+    array[0, 0] = array[-1, -1] = 1
+    array[rng.random((rows, cols)) < 0.05] = np.nan
+    return array
+
+# the direct sum of shifted arrays and the FFT convolution give the same densities for
+# every kernel, with and without normalization
+@pytest.mark.parametrize("kernel", kernels)
+@pytest.mark.parametrize("normalize", [True, False])
+def test_direct_and_fft_agree(grass_python, kernel, normalize):
+
+    from zoi_density import zoi_densities
+
+    array = features()
+    radii = [10, 30, 55]
+    direct = zoi_densities(array, radii, res = 10, kernel = kernel, method = "direct", normalize = normalize)
+    fft = zoi_densities(array, radii, res = 10, kernel = kernel, method = "fft", normalize = normalize)
+
+    for d, f in zip(direct, fft):
+        np.testing.assert_allclose(f, d, atol = 1e-9)
+
+# the row runs (circle) and the summed-area table (rectangle) agree with the direct sum
+@pytest.mark.parametrize("kernel, method", [("circle", "runs"), ("rectangle", "sat")])
+@pytest.mark.parametrize("normalize", [True, False])
+def test_runs_and_sat_agree_with_direct(grass_python, kernel, method, normalize):
+
+    from zoi_density import zoi_densities
+
+    array = features()
+    radii = [10, 30, 55]
+    direct = zoi_densities(array, radii, res = 10, kernel = kernel, method = "direct", normalize = normalize)
+    fast = zoi_densities(array, radii, res = 10, kernel = kernel, method = method, normalize = normalize)
+
+    for d, f in zip(direct, fast):
+        np.testing.assert_allclose(f, d, atol = 1e-9)
+
+# the automatic choice of methods gives the same densities as the direct sum
+@pytest.mark.parametrize("kernel", kernels)
+def test_auto_agrees_with_direct(grass_python, kernel):
+
+    from zoi_density import zoi_densities
+
+    array = features()
+    radii = [20, 60, 300]
+    direct = zoi_densities(array, radii, res = 10, kernel = kernel, method = "direct")
+    auto = zoi_densities(array, radii, res = 10, kernel = kernel)
+
+    for d, a in zip(direct, auto):
+        np.testing.assert_allclose(a, d, atol = 1e-9)
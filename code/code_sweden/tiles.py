@@ -0,0 +1,241 @@
+import os
+import json
+import hashlib
+import grass.script as grass
+
+from parallel_grass import run_parallel
+from temp_maps import temporary_maps
+from build_tasks import map_timestamp, default_state_file
+
+# function to get the region of a window of rows r0:r1 and columns c0:c1 of a region
+# (a dictionary from grass.region), as parameters for g.region
+def window_region(region, r0 = 0, r1 = 0, c0 = 0, c1 = 0):
+
+    return {"n": region["n"] - r0 * region["nsres"], "s": region["n"] - r1 * region["nsres"],
+        "w": region["w"] + c0 * region["ewres"], "e": region["w"] + c1 * region["ewres"],
+        "nsres": region["nsres"], "ewres": region["ewres"]}
+
+# function to split the current region in tiles of tile_size x tile_size cells
+# the tiles are aligned to the cells of the region, so each cell belongs to exactly one tile
+# returns a list of (row, col, region), region with the parameters for g.region
+def region_tiles(tile_size = 4000, env = None):
+
+    region = grass.region(env = env)
+    tiles = []
+    for row, r0 in enumerate(range(0, region["rows"], tile_size)):
+        r1 = min(r0 + tile_size, region["rows"])
+        for col, c0 in enumerate(range(0, region["cols"], tile_size)):
+            c1 = min(c0 + tile_size, region["cols"])
+            tiles.append((row, col, window_region(region, r0, r1, c0, c1)))
+    return tiles
+
+# function to get the name of the map of a tile
+def tile_name(output = "", row = 0, col = 0):
+
+    return output + "_tile_" + str(row) + "_" + str(col)
+
+# function to count cells of the current region by tile, where a condition is true
+# one r.mapcalc pass writes, for each cell where the condition is true, the number of its
+# tile, and r.stats counts the cells of each tile
+# returns a dictionary {tile number (row * tile columns + col): number of cells}
+def tile_counts(condition = "", tile_size = 4000):
+
+    region = grass.region()
+    tile_cols = (region["cols"] + tile_size - 1) // tile_size
+
+    with temporary_maps() as tmp:
+        tiles = tmp("tile_counts")
+        grass.mapcalc(tiles+" = if("+condition+", int((row() - 1) / "+str(tile_size)+") * "+
+            str(tile_cols)+" + int((col() - 1) / "+str(tile_size)+"), null())", quiet = True)
+        stats = grass.read_command("r.stats", input = tiles, flags = "nc", quiet = True)
+
+    counts = {}
+    for line in stats.splitlines():
+        if line.strip():
+            tile, count = line.split()
+            counts[int(tile)] = int(count)
+    return counts
+
+# function to find the tiles of the current region with non-null cells in a mask
+# returns the tiles as region_tiles
+def mask_tiles(mask = "", tile_size = 4000):
+
+    region = grass.region()
+    tile_cols = (region["cols"] + tile_size - 1) // tile_size
+    counts = tile_counts("!isnull("+mask+")", tile_size)
+    return [(row, col, tile) for row, col, tile in region_tiles(tile_size)
+        if (row * tile_cols + col) in counts]
+
+# function to patch maps in bounded groups: at most group_size maps are patched at once
+# (each input keeps its cell and null files open), and the groups are patched again until
+# one map is left; the order of the inputs (priority) is kept
+# the maps are patched in the current region, or in the region defined in env
+def patch_maps(inputs = [], output = "", group_size = 50, overwrite = True, env = None):
+
+    inputs = list(inputs)
+    with temporary_maps() as tmp:
+        while len(inputs) > group_size:
+            groups = [inputs[i:(i + group_size)] for i in range(0, len(inputs), group_size)]
+            inputs = []
+            for group in groups:
+                if len(group) == 1:
+                    inputs += group
+                    continue
+                name = tmp("patch")
+                grass.run_command("r.patch", input = group, output = name, overwrite = True,
+                    quiet = True, env = env)
+                inputs.append(name)
+        # r.patch needs at least two maps
+        if len(inputs) == 1:
+            grass.mapcalc(output+" = "+inputs[0], overwrite = overwrite, quiet = True, env = env)
+        else:
+            grass.run_command("r.patch", input = inputs, output = output, overwrite = overwrite,
+                quiet = True, env = env)
+
+    return output
+
+# function to patch the maps of tiles (as region_tiles) into output, followed by the maps
+# in after, with lower priority
+# the tiles of each tile row are patched first, in the region of the row, and the rows
+# are then patched in the current region, always in bounded groups (see patch_maps)
+def patch_tiles(tiles = [], names = [], output = "", after = [], group_size = 50):
+
+    rows = {}
+    for (row, col, tile), name in zip(tiles, names):
+        rows.setdefault(row, []).append((tile, name))
+
+    with temporary_maps() as tmp:
+        mosaics = []
+        for row in sorted(rows):
+            if len(rows[row]) == 1:
+                mosaics.append(rows[row][0][1])
+                continue
+            regions = [i[0] for i in rows[row]]
+            env = os.environ.copy()
+            env["GRASS_REGION"] = grass.region_env(n = regions[0]["n"], s = regions[0]["s"],
+                w = min(i["w"] for i in regions), e = max(i["e"] for i in regions),
+                nsres = regions[0]["nsres"], ewres = regions[0]["ewres"])
+            mosaic = tmp("row_" + str(row))
+            patch_maps([i[1] for i in rows[row]], mosaic, group_size, env = env)
+            mosaics.append(mosaic)
+
+        patch_maps(mosaics + list(after), output, group_size)
+
+    return output
+
+# function to get the signature of a tiled run: the module and its parameters, the tiles,
+# the current region, the mask and the modification time of the maps among the parameters
+def tiled_signature(module = "", params = {}, output_param = "output", tile_size = 4000, mask = None):
+
+    values = []
+    for i in params.values():
+        values += [str(j) for j in i] if isinstance(i, (list, tuple)) else str(i).split(",")
+    if mask is not None:
+        values.append(mask)
+    maps = {i: map_timestamp(i) for i in sorted(set(values))}
+    definition = {"module": module, "params": params, "output_param": output_param,
+        "tile_size": tile_size, "mask": mask, "region": grass.region(),
+        "maps": {k: v for k, v in maps.items() if v is not None}}
+    return hashlib.sha256(json.dumps(definition, sort_keys = True, default = str).encode()).hexdigest()
+
+# function to run a module by tiles of the current region, in parallel, and patch the tiles
+#   module, params: module and parameters; the output of each tile is given as
+#                   params[output_param] (default "output")
+#   mask: raster map used as MASK in every tile (e.g. computed once for the whole region);
+#         the tiles without cells in the mask are not computed
+#   resume: tiles already finished by a previous (interrupted) run are not computed again;
+#           each tile map is only copied to the current mapset when it is complete
+#           the signature of the run (see tiled_signature) is stored with the tiles, in the
+#           location folder, and the tiles are only reused if the signature did not change
+# modules must compute each output cell only from the input cells it covers (e.g.
+# r.resamp.stats, r.mapcalc without neighbors), so that there are no seams between tiles
+def run_tiled(module = "", output = "", params = {}, output_param = "output", tile_size = 4000,
+    nprocs = 4, mask = None, resume = True, keep_tiles = False, group_size = 50):
+
+    mapset = grass.gisenv()["MAPSET"]
+    if mask is not None:
+        tiles = mask_tiles(mask, tile_size)
+        print(output + ": " + str(len(tiles)) + " of " + str(len(region_tiles(tile_size))) +
+            " tiles within the mask")
+    else:
+        tiles = region_tiles(tile_size)
+    names = [tile_name(output, row, col) for row, col, tile in tiles]
+
+    # tiles of a run with other inputs, parameters, region or mask are computed again
+    signature = tiled_signature(module, params, output_param, tile_size, mask)
+    state_file = default_state_file("tiles_" + mapset + "_" + output + ".json")
+    previous = None
+    if os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            previous = json.load(f).get("signature")
+    if resume and previous != signature:
+        print(output + ": tiles of previous runs are not reused (other inputs or parameters)")
+        resume = False
+    with open(state_file, "w") as f:
+        json.dump({"signature": signature}, f)
+
+    jobs = []
+    for name, (row, col, tile) in zip(names, tiles):
+        if resume and grass.find_file(name, element = "cellhd", mapset = mapset)["file"]:
+            continue
+        job = {"region": tile, "outputs": [name],
+            "steps": [(module, dict(params, overwrite = True, **{output_param: name}))]}
+        if mask is not None:
+            job["mask"] = {"raster": mask}
+        jobs.append(job)
+
+    print(output + ": " + str(len(jobs)) + " of " + str(len(tiles)) + " tiles to compute")
+    run_parallel(jobs, nprocs = nprocs)
+
+    # mosaic, in the full region; the tiles do not overlap
+    if names:
+        patch_tiles(tiles, names, output, group_size = group_size)
+    else:
+        grass.mapcalc(output+" = null()", overwrite = True, quiet = True)
+    if names and not keep_tiles:
+        grass.run_command("g.remove", type = "raster", name = names, flags = "f", quiet = True)
+    if not keep_tiles:
+        os.remove(state_file)
+
+    return output
+
+# function to find the tiles of the current region with null cells in a map (only within
+# mask, if given)
+# returns the tiles as region_tiles, with the number of null cells in each one
+def nodata_tiles(input = "", tile_size = 4000, mask = None):
+
+    region = grass.region()
+    tile_cols = (region["cols"] + tile_size - 1) // tile_size
+    condition = "isnull("+input+")"
+    if mask is not None:
+        condition += " && !isnull("+mask+")"
+    counts = tile_counts(condition, tile_size)
+
+    return [(row, col, tile, counts[row * tile_cols + col])
+        for row, col, tile in region_tiles(tile_size) if (row * tile_cols + col) in counts]
+
+# function to fill the null cells of a map with the values of other maps (in order of priority)
+# only the tiles with null cells are patched, in parallel; the output is then written in one
+# pass from the patched tiles and the input map, instead of patching all maps everywhere
+def fill_holes(input = "", fallbacks = [], output = "", tile_size = 4000, nprocs = 4, mask = None,
+    keep_tiles = False, group_size = 50):
+
+    tiles = nodata_tiles(input, tile_size = tile_size, mask = mask)
+    print(input + ": " + str(sum(i[3] for i in tiles)) + " null cells in " + str(len(tiles)) + " tiles")
+
+    names = [tile_name(output, row, col) for row, col, tile, count in tiles]
+    jobs = []
+    for name, (row, col, tile, count) in zip(names, tiles):
+        job = {"region": tile, "outputs": [name],
+            "steps": [("r.patch", dict(input = [input] + list(fallbacks), output = name, overwrite = True))]}
+        if mask is not None:
+            job["mask"] = {"raster": mask}
+        jobs.append(job)
+    run_parallel(jobs, nprocs = nprocs)
+
+    # the patched tiles have priority over the input map
+    patch_tiles([i[:3] for i in tiles], names, output, after = [input], group_size = group_size)
+    if names and not keep_tiles:
+        grass.run_command("g.remove", type = "raster", name = names, flags = "f", quiet = True)
+
+    return output
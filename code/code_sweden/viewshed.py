@@ -0,0 +1,298 @@
+import os
+import math
+import json
+import hashlib
+import tempfile
+import numpy as np
+import grass.script as grass
+
+from parallel_grass import run_parallel
+from build_tasks import map_timestamp
+from raster_blocks import read_map, empty_map, write_map, remove_files, cell_null
+from tiles import window_region
+from temp_maps import temporary_name
+
+# earth radius (m), for the maximum visible distance: the semi-major axis of the GRS80
+# ellipsoid (SWEREF99), used by r.viewshed -c for the curvature of the earth; it is the
+# largest radius of the ellipsoid, so the distances are never shorter than r.viewshed needs
+earth_radius = 6378137.0
+
+# function to get the turbines (points) of a vector map, optionally filtered by a where clause
+# returns a list of dictionaries with x, y and cat
+def turbine_points(input = "", where = None):
+
+    params = {"where": where} if where else {}
+    out = grass.read_command("v.out.ascii", input = input, format = "point", separator = "pipe",
+        **params)
+    points = []
+    for line in out.splitlines():
+        if line.strip():
+            x, y, cat = line.split("|")[:3]
+            points.append({"x": float(x), "y": float(y), "cat": int(cat)})
+    return points
+
+# function to get the maximum distance at which a target can be seen from an observer,
+# because of the curvature of the earth: the sum of the distances to the horizon of the
+# observer and of the highest possible target, above the lowest terrain (z_min)
+def max_visible_distance(z_observer = 0.0, observer_height = 0.0, target_height = 0.0, z_min = 0.0,
+    z_max = 0.0):
+
+    horizon = lambda h: math.sqrt(2 * earth_radius * max(h, 0.0))
+    return horizon(z_observer + observer_height - z_min) + horizon(z_max + target_height - z_min)
+
+# function to get the elevation of the terrain at many points, with one r.what call
+# points without data get the value of default
+def point_elevations(dem = "", points = [], default = 0.0):
+
+    if not points:
+        return []
+    out = grass.read_command("r.what", map = dem, null_value = "*",
+        coordinates = [i for p in points for i in (p["x"], p["y"])])
+    values = [line.split("|")[3] for line in out.splitlines() if line.strip()]
+    return [default if i == "*" else float(i) for i in values]
+
+# function to get the window of the region (first and last rows and columns) within a
+# distance of a point
+def point_window(region, x = 0.0, y = 0.0, distance = 0.0):
+
+    r0 = max(int(math.floor((region["n"] - (y + distance)) / region["nsres"])), 0)
+    r1 = min(int(math.ceil((region["n"] - (y - distance)) / region["nsres"])), region["rows"])
+    c0 = max(int(math.floor((x - distance - region["w"]) / region["ewres"])), 0)
+    c1 = min(int(math.ceil((x + distance - region["w"]) / region["ewres"])), region["cols"])
+    return r0, r1, c0, c1
+
+# function to get the job computing the binary viewshed of one turbine, in the window of
+# the region within its maximum visible distance
+# the viewshed is exported (1 byte per cell, 0 where not visible) to job["file"] within the
+# temporary mapset of the job, where there is no MASK, so the viewshed does not depend on
+# the MASK of the study area; no map is copied to the current mapset
+def turbine_job(turbine, dem = "", observer_height = 0.0, target_height = 0.0, distance = 0.0,
+    region = None):
+
+    window = point_window(region, turbine["x"], turbine["y"], distance)
+    output = temporary_name("viewshed_turbine")
+    filename = os.path.join(tempfile.gettempdir(), output + ".bin")
+    return {"region": window_region(region, *window), "window": window, "turbine": turbine,
+        "steps": [("r.viewshed", dict(input = dem, output = output, flags = "bc",
+            coordinates = (turbine["x"], turbine["y"]), observer_elevation = observer_height,
+            target_elevation = target_height, max_distance = distance, overwrite = True,
+            quiet = True)),
+            ("r.out.bin", dict(input = output, output = filename, bytes = 1, null = 0,
+            overwrite = True, quiet = True))],
+        "outputs": [], "file": filename}
+
+# function to get the key of the viewshed of a turbine in the cache
+# the viewshed depends on the turbine position, observer and target heights, maximum distance,
+# the DEM (full name) and its version (modification time, computed if dem_version is None)
+# and the region (extent and resolution)
+def viewshed_key(turbine, observer_height = 0.0, target_height = 0.0, distance = 0.0, dem = "",
+    region = None, dem_version = None):
+
+    if dem_version is None:
+        dem_version = map_timestamp(dem)
+    key = {"x": turbine["x"], "y": turbine["y"], "observer_height": observer_height,
+        "target_height": target_height, "distance": round(distance, 3), "dem": dem,
+        "dem_version": dem_version, "flags": "bc",
+        "region": [region[i] for i in ("n", "s", "e", "w", "nsres", "ewres")]}
+    return hashlib.sha1(json.dumps(key, sort_keys = True).encode()).hexdigest()
+
+# function to get the file of a viewshed in the cache
+def cache_file(cache_dir = "", key = ""):
+
+    return os.path.join(cache_dir, key + ".npz")
+
+# function to store the binary viewshed of a turbine (array of its window) in the cache
+def save_viewshed(cache_dir = "", key = "", window = None, visible = None):
+
+    visible = np.asarray(visible) > 0
+    tmp = cache_file(cache_dir, key) + ".tmp.npz"
+    np.savez_compressed(tmp, window = np.array(window), shape = np.array(visible.shape),
+        bits = np.packbits(visible))
+    os.replace(tmp, cache_file(cache_dir, key))
+
+# function to read the binary viewshed of a turbine from the cache
+# returns the window and the array (0/1) of the window
+def load_viewshed(cache_dir = "", key = ""):
+
+    with np.load(cache_file(cache_dir, key)) as f:
+        shape = tuple(f["shape"])
+        visible = np.unpackbits(f["bits"])[:shape[0] * shape[1]].reshape(shape)
+        return tuple(int(i) for i in f["window"]), visible.astype(np.int32)
+
+# function to get the file with the turbines counted in the count map of a park
+def park_state_file(cache_dir = "", output = "", mapset = ""):
+
+    return os.path.join(cache_dir, "park_" + mapset + "_" + output + ".json")
+
+# function to write the state of the count map of a park, replacing the previous file
+# only when the new one is complete
+def save_park_state(state_file = "", state = {}):
+
+    tmp = state_file + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, state_file)
+
+# function to compute the cumulative viewshed of wind parks, in the current region
+#   parks: list of dictionaries with output (name of the count map), height (of the turbines,
+#          observer elevation) and turbines (list from turbine_points)
+#   max_distance: maximum distance of the viewsheds; by default, the maximum visible
+#                 distance of each turbine given the curvature of the earth (-c)
+#   cache_dir: folder where the viewshed of each turbine is kept; with a cache, only the
+#              viewsheds of new turbines are computed, and if the count map of a park
+#              exists from a previous run, it is updated by adding the viewsheds of the
+#              turbines added and subtracting those of the turbines removed
+#              the cache is keyed by the version of the DEM, so the DEM should be a map
+#              that is not rewritten between runs (e.g. the national DEM, not a copy cut
+#              for the study area); the viewsheds are computed without MASK
+#              the state of each count map records the version of the map it describes,
+#              so a count map written without its state (interrupted run) is not updated,
+#              but computed again from the cache
+# the viewshed of each turbine is computed only within its maximum distance, and the
+# turbines of all parks are distributed among nprocs processes; the binary viewsheds are
+# added to the count of their park as the turbines finish
+# for each park, the number of turbines visible (output) and output+"_binary" (1 where
+# the count is above threshold, 0 elsewhere) are written; if combined is given, a binary map
+# with 1 where any park is visible is also written
+# if there is a MASK in the current mapset, the maps are null outside of it
+def cumulative_viewshed(parks = [], dem = "", target_height = 1.1, max_distance = None,
+    threshold = 1, combined = None, nprocs = 4, cache_dir = None):
+
+    region = grass.region()
+    dem = grass.find_file(dem, element = "cellhd")["fullname"]
+    dem_version = map_timestamp(dem)
+    info = grass.raster_info(dem)
+    mapset = grass.gisenv()["MAPSET"]
+    region_key = [region[i] for i in ("n", "s", "e", "w", "nsres", "ewres")]
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok = True)
+
+    # viewsheds of all turbines, by key
+    jobs = {}
+    park_keys = []
+    for park in parks:
+        if max_distance is None:
+            elevations = point_elevations(dem, park["turbines"], default = info["max"])
+        keys = []
+        for i, turbine in enumerate(park["turbines"]):
+            if max_distance is None:
+                distance = max_visible_distance(elevations[i], park["height"], target_height,
+                    info["min"], info["max"])
+            else:
+                distance = max_distance
+            key = viewshed_key(turbine, park["height"], target_height, distance, dem, region,
+                dem_version = dem_version)
+            if key not in jobs:
+                jobs[key] = turbine_job(turbine, dem = dem, observer_height = park["height"],
+                    target_height = target_height, distance = distance, region = region)
+                jobs[key]["key"] = key
+            keys.append(key)
+        park_keys.append(keys)
+
+    # count of visible turbines for each park, from zero or from the previous count map;
+    # viewsheds to add and to subtract
+    counts = []
+    add = []
+    subtract = []
+    for park, keys in zip(parks, park_keys):
+        count = empty_map("CELL")
+        count[:] = 0
+        added, removed = list(keys), []
+        state_file = None if cache_dir is None else park_state_file(cache_dir, park["output"], mapset)
+        if state_file is not None and os.path.exists(state_file):
+            with open(state_file, "r") as f:
+                state = json.load(f)
+            previous = state["turbines"]
+            removed = [i for i in previous if i not in keys]
+            version = map_timestamp(park["output"] + "@" + mapset)
+            # the previous map is only updated if it is the map described by the state,
+            # and if it has the same region
+            if version is not None and state.get("map") == version and state["region"] == region_key and \
+                all(os.path.exists(cache_file(cache_dir, i)) for i in removed):
+                previous_count = read_map(park["output"])
+                count[:] = np.nan_to_num(previous_count, nan = 0).astype(np.int32)
+                filename = previous_count.filename
+                del previous_count
+                remove_files([filename])
+                added = [i for i in keys if i not in previous]
+            else:
+                removed = []
+        print(park["output"] + ": " + str(len(added)) + " turbines to add, " + str(len(removed)) +
+            " to remove")
+        counts.append(count)
+        add.append(set(added))
+        subtract.append(set(removed))
+
+    # viewsheds to compute: added and not in the cache
+    needed = set().union(*add)
+    cached = set(i for i in needed if cache_dir is not None and os.path.exists(cache_file(cache_dir, i)))
+    to_compute = [jobs[i] for i in needed if i not in cached]
+
+    # add a viewshed to the counts of the parks where it was added, in its window
+    def add_viewshed(key, window, visible):
+        r0, r1, c0, c1 = window
+        for count, keys in zip(counts, add):
+            if key in keys:
+                count[r0:r1, c0:c1] += visible
+
+    # computed viewsheds are added (and stored in the cache) as the turbines finish
+    def add_count(job):
+        r0, r1, c0, c1 = job["window"]
+        visible_cells = np.fromfile(job["file"], dtype = np.uint8).reshape(r1 - r0, c1 - c0)
+        visible_cells = visible_cells.astype(np.int32)
+        os.remove(job["file"])
+        if cache_dir is not None:
+            save_viewshed(cache_dir, job["key"], job["window"], visible_cells)
+        add_viewshed(job["key"], job["window"], visible_cells)
+
+    print(str(len(to_compute)) + " turbines to compute, " + str(len(cached)) + " in the cache")
+    run_parallel(to_compute, nprocs = nprocs, on_merged = add_count)
+
+    # viewsheds from the cache
+    for key in cached:
+        add_viewshed(key, *load_viewshed(cache_dir, key))
+    for count, keys in zip(counts, subtract):
+        for key in keys:
+            (r0, r1, c0, c1), visible = load_viewshed(cache_dir, key)
+            count[r0:r1, c0:c1] -= visible
+
+    # cells outside the MASK (r.in.bin does not apply it when writing)
+    outside = None
+    if grass.find_file("MASK", element = "cellhd", mapset = mapset)["file"]:
+        mask = read_map("MASK")
+        outside = np.isnan(mask)
+        filename = mask.filename
+        del mask
+        remove_files([filename])
+
+    # count and binary maps
+    any_visible = empty_map("CELL") if combined else None
+    if any_visible is not None:
+        any_visible[:] = 0
+    filenames = []
+    for park, count, keys in zip(parks, counts, park_keys):
+        binary = empty_map("CELL")
+        binary[:] = count > threshold
+        if any_visible is not None:
+            any_visible |= binary
+        if outside is not None:
+            np.putmask(count, outside, cell_null)
+            np.putmask(binary, outside, cell_null)
+        write_map(count, park["output"], "CELL")
+        write_map(binary, park["output"]+"_binary", "CELL")
+        filenames += [count.filename, binary.filename]
+        del binary
+        # turbines counted in the map, and version of the map
+        if cache_dir is not None:
+            save_park_state(park_state_file(cache_dir, park["output"], mapset), {"region": region_key,
+                "turbines": keys, "map": map_timestamp(park["output"] + "@" + mapset)})
+    if any_visible is not None:
+        if outside is not None:
+            np.putmask(any_visible, outside, cell_null)
+        write_map(any_visible, combined, "CELL")
+        filenames.append(any_visible.filename)
+    counts.clear()
+    del any_visible
+    remove_files(filenames)
+
+    return [park["output"] for park in parks]
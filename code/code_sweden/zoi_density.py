@@ -0,0 +1,225 @@
+import os
+import math
+import time
+import json
+import numpy as np
+import grass.script as grass
+
+from raster_blocks import map_blocks, summed_area_table, window_sum
+from export_maps import export_multiband
+
+# zone of influence (ZOI) densities: weighted sums (or averages, if the kernel is normalized)
+# of a map within a neighborhood of each cell, for several radii at once
+# nulls are taken as 0 (no feature), as are the cells outside the map
+#   kernels: "rectangle" - square of side 2*radius + 1 cell
+#            "circle" - cells within the radius
+#            "gaussian" - Gaussian decay, with weight zoi_limit at the radius
+#            "exp_decay" - exponential decay, with weight zoi_limit at the radius
+#   methods: "sat" - summed-area table (rectangle, any radius, one table for all radii)
+#            "runs" - sums of row runs from cumulative sums along rows (circle)
+#            "direct" - sum of shifted arrays, one per kernel cell (small kernels)
+#            "fft" - FFT convolution (large kernels; one transform of the map for all radii)
+
+# function to get the radius of a kernel in cells
+def radius_cells(radius = 0.0, res = 1.0):
+
+    return int(math.floor(radius / res))
+
+# function to get the weights of a ZOI kernel of a given radius (map units)
+# gaussian and exp_decay kernels are truncated at the radius, where the weight is zoi_limit
+def zoi_kernel(radius = 0.0, res = 1.0, kernel = "circle", zoi_limit = 0.05, normalize = True):
+
+    r = radius_cells(radius, res)
+    y, x = np.mgrid[-r:(r + 1), -r:(r + 1)]
+    d = np.sqrt(x**2 + y**2) * res
+
+    if kernel == "rectangle":
+        w = np.ones(d.shape)
+    elif kernel == "circle":
+        w = (d <= radius).astype(float)
+    elif kernel == "gaussian":
+        sigma = radius / math.sqrt(2 * math.log(1 / zoi_limit))
+        w = np.where(d <= radius, np.exp(-d**2 / (2 * sigma**2)), 0.0)
+    elif kernel == "exp_decay":
+        rate = math.log(1 / zoi_limit) / radius
+        w = np.where(d <= radius, np.exp(-rate * d), 0.0)
+    else:
+        raise ValueError("Kernel <" + kernel + "> not available.")
+
+    if normalize:
+        w = w / w.sum()
+    return w
+
+# function to choose the method for a kernel and radius (cells)
+# direct for small kernels, sat for rectangles, runs for circles up to fft_radius, fft otherwise
+def choose_method(kernel = "circle", r = 0, direct_radius = 3, fft_radius = 25):
+
+    if kernel == "rectangle":
+        return "sat"
+    if r <= direct_radius:
+        return "direct"
+    if kernel == "circle" and r <= fft_radius:
+        return "runs"
+    return "fft"
+
+# convolution of an array with a kernel, as the sum of shifted arrays
+def convolve_direct(array, kernel):
+
+    r = kernel.shape[0] // 2
+    rows, cols = array.shape
+    padded = np.pad(array, r)
+    out = np.zeros(array.shape)
+    for i, j in zip(*np.nonzero(kernel)):
+        out += kernel[i, j] * padded[i:(i + rows), j:(j + cols)]
+    return out
+
+# sum within a circle of radius r cells, from the cumulative sums along rows: the circle
+# is a set of row runs, one per row offset, each summed in constant time
+def circle_sum(array, r = 1, res = 1.0, radius = None):
+
+    radius = r * res if radius is None else radius
+    rows, cols = array.shape
+    padded = np.pad(array, r)
+    csum = np.zeros((rows + 2 * r, cols + 2 * r + 1))
+    np.cumsum(padded, axis = 1, out = csum[:, 1:])
+
+    out = np.zeros(array.shape)
+    for dy in range(-r, r + 1):
+        # half width of the run, in cells
+        half = int(math.floor(math.sqrt(max(radius**2 - (dy * res)**2, 0.0)) / res + 1e-9))
+        band = csum[(r + dy):(r + dy + rows)]
+        out += band[:, (r + half + 1):(r + half + 1 + cols)] - band[:, (r - half):(r - half + cols)]
+    return out
+
+# convolution of an array with several kernels by FFT, zero padded (no wrap around)
+# the transform of the array is computed once for all kernels
+def convolve_fft(array, kernels = []):
+
+    rmax = max(k.shape[0] for k in kernels) // 2
+    rows, cols = array.shape
+    shape = (rows + 2 * rmax, cols + 2 * rmax)
+    fa = np.fft.rfft2(array, shape)
+
+    out = []
+    for k in kernels:
+        r = k.shape[0] // 2
+        conv = np.fft.irfft2(fa * np.fft.rfft2(k, shape), shape)
+        out.append(conv[r:(r + rows), r:(r + cols)])
+    return out
+
+# function to compute the ZOI densities of an array for several radii (map units)
+# method: "auto" (choose_method for each radius) or one of the methods
+# returns a list of arrays, one per radius
+def zoi_densities(array, radii = [], res = 1.0, kernel = "circle", method = "auto", zoi_limit = 0.05,
+    normalize = True):
+
+    values = np.nan_to_num(np.asarray(array, dtype = np.float64), nan = 0.0)
+    out = [None] * len(radii)
+    fft = []
+    sat = None
+
+    for index, radius in enumerate(radii):
+        r = radius_cells(radius, res)
+        m = choose_method(kernel, r) if method == "auto" else method
+        if m == "sat":
+            if kernel != "rectangle":
+                raise ValueError("Method sat is only available for the rectangle kernel.")
+            if sat is None:
+                sat = summed_area_table(values)
+            out[index] = window_sum(sat, 2 * r + 1) / ((2 * r + 1)**2 if normalize else 1)
+        elif m == "runs":
+            if kernel != "circle":
+                raise ValueError("Method runs is only available for the circle kernel.")
+            w = zoi_kernel(radius, res, kernel, zoi_limit, normalize = False)
+            out[index] = circle_sum(values, r, res, radius) / (w.sum() if normalize else 1)
+        elif m == "direct":
+            out[index] = convolve_direct(values, zoi_kernel(radius, res, kernel, zoi_limit, normalize))
+        elif m == "fft":
+            fft.append(index)
+        else:
+            raise ValueError("Method <" + m + "> not available.")
+
+    # all FFT radii with one transform of the map
+    if fft:
+        kernels = [zoi_kernel(radii[i], res, kernel, zoi_limit, normalize) for i in fft]
+        for index, conv in zip(fft, convolve_fft(values, kernels)):
+            out[index] = conv
+
+    return out
+
+# function to get the names of the ZOI density maps of an input map
+def zoi_names(input = "", radii = [], kernel = "circle"):
+
+    return [input.split("@")[0] + "_zoi_" + kernel + "_" + str(int(i)) for i in radii]
+
+# function to compute the ZOI density maps of a map for several radii, in one pass
+# the map is processed by blocks of rows with an overlap of the largest radius, so the
+# densities are exact; blocks are processed in parallel (see raster_blocks.map_blocks)
+# the kernels are defined in cells of size res, so the cells of the region must be square
+def zoi_density_maps(input = "", radii = [], kernel = "circle", outputs = None, res = None,
+    method = "auto", zoi_limit = 0.05, normalize = True, block_rows = 1024, nthreads = 4,
+    overwrite = True):
+
+    region = grass.region()
+    if region["nsres"] != region["ewres"]:
+        raise ValueError("The cells of the region are not square (nsres " + str(region["nsres"]) +
+            ", ewres " + str(region["ewres"]) + ").")
+    if res is None:
+        res = region["nsres"]
+    if outputs is None:
+        outputs = zoi_names(input, radii, kernel)
+    overlap = max(radius_cells(i, res) for i in radii)
+
+    def densities(input):
+        return tuple(zoi_densities(input, radii, res = res, kernel = kernel, method = method,
+            zoi_limit = zoi_limit, normalize = normalize))
+
+    return map_blocks(densities, inputs = {"input": input}, outputs = outputs, output_type = "FCELL",
+        block_rows = block_rows, overlap = overlap, nthreads = nthreads, overwrite = overwrite)
+
+# function to compute the ZOI densities of several layers at several radii and write them
+# as a single cube (layer x scale x y x x): a tiled, multiband GeoTIFF with pixel interleave,
+# so the values of all covariates of a cell are stored together and read with one seek
+#   layers: list of input maps; radii: list of radii (map units)
+# the bands are ordered by layer and then by radius; their names, layers and radii are
+# written to output+".json"; the density maps are kept in the mapset if keep_maps is True
+def density_cube(layers = [], radii = [], output = "", kernel = "circle", keep_maps = True,
+    **kwargs):
+
+    bands = []
+    for layer in layers:
+        names = zoi_density_maps(layer, radii, kernel = kernel, **kwargs)
+        bands += [{"band": len(bands) + i + 1, "name": name, "layer": layer, "radius": radius,
+            "kernel": kernel} for i, (name, radius) in enumerate(zip(names, radii))]
+
+    maps = [i["name"] for i in bands]
+    export_multiband(maps, output, group = "density_cube", interleave = "PIXEL")
+    with open(os.path.splitext(output)[0] + ".json", "w") as f:
+        json.dump(bands, f, indent = 2)
+
+    if not keep_maps:
+        grass.run_command("g.remove", type = "raster", name = maps, flags = "f", quiet = True)
+
+    return bands
+
+# function to compare the time of zoi_density_maps with r.neighbors (circular window,
+# average), for one radius; the r.neighbors output is named output+"_neighbors"
+# r.neighbors averages only the non-null cells, so the values differ where there are nulls
+def benchmark_zoi(input = "", radius = 0.0, output = "", **kwargs):
+
+    res = grass.region()["nsres"]
+    size = 2 * radius_cells(radius, res) + 1
+
+    start = time.perf_counter()
+    grass.run_command("r.neighbors", input = input, output = output+"_neighbors", method = "average",
+        size = size, flags = "c", overwrite = True, quiet = True)
+    time_neighbors = time.perf_counter() - start
+
+    start = time.perf_counter()
+    zoi_density_maps(input, [radius], kernel = "circle", outputs = [output], **kwargs)
+    time_zoi = time.perf_counter() - start
+
+    print(output + ": r.neighbors " + str(round(time_neighbors, 2)) + " s, ZOI engine " +
+        str(round(time_zoi, 2)) + " s")
+
+    return {"r.neighbors": time_neighbors, "zoi": time_zoi}